@@ -1,28 +1,372 @@
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+except ImportError:  # older Streamlit
+    add_script_run_ctx = get_script_run_ctx = None
+
+try:
+    import brotli  # noqa: F401  (lets urllib3 decode brotli responses)
+    ACCEPT_ENCODING = "br, gzip, deflate"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+def secret(name, default=None):
+    """
+    Value of st.secrets[name], or `default` when it is unset or the app runs
+    without a secrets file (e.g. on the local data source).
+    """
+    try:
+        return st.secrets[name]
+    except (KeyError, FileNotFoundError):
+        return default
 
-SUPABASE_URL = 'https://bvkfmjbkamxntyclcymu.supabase.co'
 
-SUPABASE_KEY = st.secrets["API_KEY"]
+# Overridable to point the dashboard at another PostgREST (e.g. loadtest/stub_server.py)
+SUPABASE_URL = os.environ.get("SUPABASE_URL", 'https://bvkfmjbkamxntyclcymu.supabase.co')
+
+SUPABASE_KEY = secret("API_KEY")
 
 HEADERS = {
-    "apikey": SUPABASE_KEY,
-    "Authorization": f"Bearer {SUPABASE_KEY}",
     "Content-Type": "application/json"
 }
+if SUPABASE_KEY:
+    HEADERS.update({"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"})
+
+# (connect, read) timeouts in seconds
+TIMEOUT = (3.05, 20)
+# Keep-alive connections shared by every session of the app
+POOL_SIZE = 16
+# Background prefetches (cache warming for the next page or view)
+PREFETCH_WORKERS = 4
+
+
+def _build_session():
+    retry = Retry(
+        total=2,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+    )
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS)
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    return session
+
+
+# Module state lives for the whole server process, so all reruns and users share the pool
+SESSION = _build_session()
+_executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="supabase")
+# Prefetches run on their own pool: they may fan out on _executor (get_all) and must
+# not hold the workers their own requests are waiting for
+_prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+# In-flight prefetches by key, so reruns don't queue the same load again
+_prefetching = {}
+_prefetch_lock = threading.Lock()
+# Set on _executor workers, whose nested fan-outs run inline
+_pool_thread = threading.local()
+
+
+def get_json(table, params):
+    """
+    GET a PostgREST table through the shared session.
+    Raises requests.HTTPError on error responses and requests.Timeout when Supabase hangs.
+    """
+    response = SESSION.get(f"{SUPABASE_URL}/rest/v1/{table}", params=params, timeout=TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+def read_csv(content, dtypes):
+    """
+    Decode a PostgREST CSV body straight into typed columns.
+    Only empty fields are missing values ("NA" is Namibia, not null).
+    """
+    if not content.strip():
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in dtypes.items()})
+    return pd.read_csv(io.BytesIO(content), dtype=dtypes, keep_default_na=False, na_values=[""])
+
+
+def get_frame(table, params, dtypes):
+    """
+    GET a PostgREST table as CSV and decode it into a DataFrame with `dtypes`,
+    skipping the list-of-dicts step of get_json for large numeric reads.
+    """
+    response = SESSION.get(f"{SUPABASE_URL}/rest/v1/{table}", params=params, headers={"Accept": "text/csv"}, timeout=TIMEOUT)
+    response.raise_for_status()
+    return read_csv(response.content, dtypes)
+
+
+def get_page(table, params, offset, limit, dtypes=None):
+    """
+    One page of a PostgREST query, selected with a Range header.
+    With `dtypes` the page is transferred as CSV and returned as a DataFrame,
+    otherwise as a list of dicts.
+    Returns:
+    - (rows, total) where total is the full row count from Content-Range, or None if unknown
+    """
+    headers = {"Range-Unit": "items", "Range": f"{offset}-{offset + limit - 1}", "Prefer": "count=exact"}
+    if dtypes is not None:
+        headers["Accept"] = "text/csv"
+    response = SESSION.get(f"{SUPABASE_URL}/rest/v1/{table}", params=params, headers=headers, timeout=TIMEOUT)
+    if response.status_code == 416:  # range starts past the last row
+        return ([] if dtypes is None else read_csv(b"", dtypes)), offset
+    response.raise_for_status()
+    total = response.headers.get("Content-Range", "*/*").rsplit("/", 1)[-1]
+    rows = response.json() if dtypes is None else read_csv(response.content, dtypes)
+    return rows, int(total) if total.isdigit() else None
+
+
+def _bind_script_ctx(call):
+    """
+    Wrap `call` so that it runs with the calling session's Streamlit script context,
+    which keeps st.cache_data and friends working from pool threads.
+    """
+    ctx = get_script_run_ctx() if get_script_run_ctx else None
+
+    def run():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return call()
+
+    return run
+
+
+def prefetch(call, key=None):
+    """
+    Start a zero-argument callable in the background and return immediately
+    (e.g. to warm a cache for the next page). With a `key`, a call whose key is
+    still loading is not started again: the running one is returned.
+    """
+    with _prefetch_lock:
+        if key is not None and key in _prefetching:
+            return _prefetching[key]
+        future = _prefetch_executor.submit(_bind_script_ctx(call))
+        if key is not None:
+            _prefetching[key] = future
+    if key is not None:
+        future.add_done_callback(lambda done: _forget_prefetch(key, done))
+    return future
+
+
+def _forget_prefetch(key, future):
+    with _prefetch_lock:
+        if _prefetching.get(key) is future:
+            del _prefetching[key]
+
+
+def _on_pool(call):
+    def run():
+        _pool_thread.active = True
+        return call()
 
-def fetch_latest_players():
-    url = f"{SUPABASE_URL}/rest/v1/latest_player_metrics?select=*&order=rank365avg.asc&limit=10000"
-    return requests.get(url, headers=HEADERS).json()
+    return run
 
-def fetch_latest_competitions():
-    url = f"{SUPABASE_URL}/rest/v1/latest_competition_ranking?select=*&order=rank365avg_avg.asc&limit=10000"
-    return requests.get(url, headers=HEADERS).json()
 
-def fetch_player_by_id(person_id):
-    url = f"{SUPABASE_URL}/rest/v1/player_metrics?personId=eq.{person_id}&select=personId&limit=1"
-    return requests.get(url, headers=HEADERS).json()
+def fetch_concurrently(*calls):
+    """
+    Run several zero-argument callables (typically PostgREST queries) in parallel.
+    Returns their results in the same order, so the wait is the slowest call
+    rather than the sum of all of them. Called from a pool worker, the calls run
+    one after the other instead: waiting on the pool from inside it can deadlock it.
+    """
+    if getattr(_pool_thread, "active", False):
+        return [call() for call in calls]
+    futures = [_executor.submit(_on_pool(_bind_script_ctx(call))) for call in calls]
+    return [future.result() for future in futures]
+
+
+# Converters from the WCA's stored results to the values shown: times are in centiseconds, FMC
+# singles in moves and means in hundredths of a move, multi-blind results are encoded as 0DDTTTTTMM
+# with 99 - DD the points (solved - missed)
+def _hundredths(values):
+    return values / 100
+
+def _as_is(values):
+    return values
+
+def _multi_points(values):
+    return 99 - values // 10 ** 7
+
+def _mean_multi_points(values):
+    # Means of encoded results: within TTTTTMM / 10**7 (under 0.04 in the hour limit) of the mean points
+    return 99 - values / 10 ** 7
+
+def _event(name, unit="s", average="5 Solves", ranked_by="avg", single=_hundredths, mean=_hundredths):
+    """
+    Display spec of a WCA event:
+    - unit: of its values; average: label of its average ("5 Solves", "Mean of 3"), None when it has none
+    - ranked_by: the result kind its leaderboards are sorted and filtered on ("avg" or "best")
+    - single / mean: converters of its singles and of its averages and competition performances
+      (which average singles for events ranked by single)
+    """
+    return {"name": name, "unit": unit, "average": average, "ranked_by": ranked_by, "single": single, "mean": mean}
+
+# WCA events the rankings are computed for (fetch-data/pipeline.py EVENTS, ranked by single
+# as in pipeline.RANKED_BY_SINGLE)
+EVENTS = {
+    "333": _event("3x3x3 Cube"),
+    "222": _event("2x2x2 Cube"),
+    "444": _event("4x4x4 Cube"),
+    "555": _event("5x5x5 Cube"),
+    "666": _event("6x6x6 Cube", average="Mean of 3"),
+    "777": _event("7x7x7 Cube", average="Mean of 3"),
+    "333bf": _event("3x3x3 Blindfolded", average="Mean of 3", ranked_by="best"),
+    "333fm": _event("3x3x3 Fewest Moves", unit="moves", average="Mean of 3", single=_as_is),
+    "333oh": _event("3x3x3 One-Handed"),
+    "clock": _event("Clock"),
+    "minx": _event("Megaminx"),
+    "pyram": _event("Pyraminx"),
+    "skewb": _event("Skewb"),
+    "sq1": _event("Square-1"),
+    "444bf": _event("4x4x4 Blindfolded", average="Mean of 3", ranked_by="best"),
+    "555bf": _event("5x5x5 Blindfolded", average="Mean of 3", ranked_by="best"),
+    "333mbf": _event("3x3x3 Multi-Blind", unit="points", average=None, ranked_by="best",
+                     single=_multi_points, mean=_mean_multi_points),
+}
+DEFAULT_EVENT = "333"
+
+def event_name(event):
+    return EVENTS[event]["name"]
+
+def rank_column(event, window="365"):
+    """
+    World rank column the leaderboards of `event` are sorted on.
+    """
+    return f"rank{window}{EVENTS[event]['ranked_by']}"
+
+# Leaderboard columns actually displayed by the tabs
+PLAYER_COLUMNS = [
+    "id", "name", "country",
+    "best_365", "average_365", "best_90", "average_90",
+    "rank90best", "rank90avg", "rank365best", "rank365avg",
+    "rank90best_national", "rank90avg_national", "rank365best_national", "rank365avg_national",
+]
+COMPETITION_COLUMNS = [
+    "competition_id", "comp_id", "name", "city", "country", "date_from",
+    "rank90avg_avg", "rank365avg_avg", "perf90avg", "perf365avg",
+]
+# Rows per leaderboard page
+LEADERBOARD_PAGE_SIZE = 500
+
+# Column types of the CSV reads; ranks are floats because they can be null
+TEXT_COLUMNS = {"id", "name", "country", "city", "competition_id", "comp_id", "personId", "date", "date_from"}
+
+def dtypes_for(columns):
+    return {column: str if column in TEXT_COLUMNS else "float64" for column in columns}
+
+PLAYER_DTYPES = dtypes_for(PLAYER_COLUMNS)
+COMPETITION_DTYPES = dtypes_for(COMPETITION_COLUMNS)
+
+# Rankings are stored per event: every query on these tables filters on it
+def fetch_latest_players(page=0, page_size=LEADERBOARD_PAGE_SIZE, event=DEFAULT_EVENT):
+    params = {"event": f"eq.{event}", "select": ",".join(PLAYER_COLUMNS), "order": f"{rank_column(event)}.asc,id.asc"}
+    return get_page("latest_player_metrics", params, page * page_size, page_size, PLAYER_DTYPES)
+
+def fetch_latest_competitions(page=0, page_size=LEADERBOARD_PAGE_SIZE, event=DEFAULT_EVENT):
+    params = {"event": f"eq.{event}", "select": ",".join(COMPETITION_COLUMNS), "order": "rank365avg_avg.asc,competition_id.asc"}
+    return get_page("latest_competition_ranking", params, page * page_size, page_size, COMPETITION_DTYPES)
+
+def fetch_player_by_id(person_id, event=DEFAULT_EVENT):
+    return get_json("player_metrics", {"event": f"eq.{event}", "personId": f"eq.{person_id}", "select": "personId", "limit": 1})
 
 def fetch_competition_by_id(comp_id):
-    url = f"{SUPABASE_URL}/rest/v1/competitions?comp_id=eq.{comp_id}&select=comp_id,name&limit=1"
-    return requests.get(url, headers=HEADERS).json()
+    return get_json("competitions", {"comp_id": f"eq.{comp_id}", "select": "comp_id,name", "limit": 1})
+
+# player_metrics columns, in table order
+METRIC_COLUMNS = [
+    "date", "personId",
+    "rank90best", "rank90avg", "rank365best", "rank365avg",
+    "best_365", "average_365", "best_90", "average_90",
+    "country",
+    "rank90best_national", "rank90avg_national", "rank365best_national", "rank365avg_national",
+]
+
+def fetch_player_history(person_id, event=DEFAULT_EVENT):
+    params = {"event": f"eq.{event}", "personId": f"eq.{person_id}", "select": ",".join(METRIC_COLUMNS), "order": "date.asc"}
+    return get_frame("player_metrics", params, dtypes_for(METRIC_COLUMNS))
+
+def fetch_competition_history(comp_id, event=DEFAULT_EVENT):
+    return get_json("competition_ranking", {"event": f"eq.{event}", "comp_id": f"eq.{comp_id}", "select": "*"})
+
+def fetch_competition_metadata(comp_id):
+    return get_json("competitions", {"comp_id": f"eq.{comp_id}", "select": "id,name,city,country,date_from"})
+
+def fetch_dataset_version(event=DEFAULT_EVENT):
+    """
+    Fingerprint of the player_metrics rows of `event` written by the last load, or
+    None for databases loaded before the dataset_versions table existed.
+    """
+    try:
+        rows = get_json("dataset_versions", {"event": f"eq.{event}", "select": "version"})
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code in (400, 404):
+            return None
+        raise
+    return rows[0]["version"] if rows else None
+
+# Rows per request when downloading a whole table (PostgREST caps responses at 1000 rows by default)
+BULK_PAGE_SIZE = 1000
+
+def get_all(table, params, dtypes=None, page_size=BULK_PAGE_SIZE):
+    """
+    Every row of a PostgREST query: the first page gives the total, the remaining
+    pages are fetched in parallel. `params` must include a deterministic order.
+    With `dtypes` the pages are read as CSV and concatenated into one DataFrame.
+    """
+    rows, total = get_page(table, params, 0, page_size, dtypes)
+    if total is None or total <= page_size:
+        return rows
+    pages = fetch_concurrently(*[
+        lambda offset=offset: get_page(table, params, offset, page_size, dtypes)[0]
+        for offset in range(page_size, total, page_size)
+    ])
+    if dtypes is not None:
+        return pd.concat([rows] + pages, ignore_index=True)
+    for page_rows in pages:
+        rows.extend(page_rows)
+    return rows
+
+def fetch_search_entries(event=DEFAULT_EVENT):
+    """
+    Light id/name projection of both leaderboards of `event`, used to build the search index.
+    Returns:
+    - (players, competitions) as lists of dicts
+    """
+    event_filter = f"eq.{event}"
+    players = get_all("latest_player_metrics", {"event": event_filter, "select": "id,name", "order": "id.asc"})
+    competitions = get_all("latest_competition_ranking",
+                           {"event": event_filter, "select": "competition_id,comp_id,name", "order": "competition_id.asc"})
+    return players, competitions
+
+# Rank columns plotted by the comparison view
+COMPARE_COLUMNS = [
+    "rank90best", "rank90avg", "rank365best", "rank365avg",
+    "rank90best_national", "rank90avg_national", "rank365best_national", "rank365avg_national",
+]
+
+def fetch_players_history(person_ids, event=DEFAULT_EVENT):
+    """
+    Rank history of several players with a single `personId=in.(...)` query
+    (paged, since the histories together exceed one PostgREST response).
+    """
+    columns = ["personId", "date"] + COMPARE_COLUMNS
+    params = {
+        "event": f"eq.{event}",
+        "personId": f"in.({','.join(person_ids)})",
+        "select": ",".join(columns),
+        "order": "personId.asc,date.asc",
+    }
+    return get_all("player_metrics", params, dtypes_for(columns))
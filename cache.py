@@ -1,10 +1,268 @@
-import streamlit as st
-from api import fetch_latest_players, fetch_latest_competitions
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 
-@st.cache_data(ttl=3600)
-def get_cached_players():
-    return fetch_latest_players()
+import pandas as pd
 
-@st.cache_data(ttl=3600)
-def get_cached_competitions():
-    return fetch_latest_competitions()
+from api import DEFAULT_EVENT, prefetch
+from data_source import get_source
+
+logger = logging.getLogger(__name__)
+
+# Leaderboards older than this are served as-is and refreshed in the background
+TTL_SECONDS = 3600
+# Memory budget for the evictable entries (player / competition histories)
+MAX_BYTES = 256 * 1024 * 1024
+# Top players and competitions whose detail pages are loaded at startup
+WARMUP_TOP_N = 50
+WARMUP_WORKERS = 8
+
+
+def estimate_size(value):
+    """
+    Rough in-memory size of a cached value in bytes (sampled for long lists).
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return sys.getsizeof(value)
+        sample = value[:100]
+        per_item = sum(estimate_size(item) for item in sample) / len(sample)
+        return sys.getsizeof(value) + int(per_item * len(value))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(k) + estimate_size(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class _Entry:
+    __slots__ = ('value', 'loaded_at', 'version', 'size', 'pinned', 'refresh')
+
+    def __init__(self, value, version, pinned):
+        self.value = value
+        self.loaded_at = time.monotonic()
+        self.version = version
+        self.size = estimate_size(value)
+        self.pinned = pinned
+        self.refresh = None
+
+
+class SWRCache:
+    """
+    Process-wide stale-while-revalidate cache shared by every Streamlit session.
+
+    - A fresh entry is returned as-is.
+    - A stale entry is returned immediately and refreshed once in a background
+      thread; concurrent readers share that single refresh.
+    - A miss loads synchronously; concurrent readers of the same key wait for
+      the same load instead of issuing their own.
+    - Unpinned entries live in an LRU bounded by `max_bytes`; pinned entries
+      (the leaderboards) are never evicted.
+
+    Every successful (re)load bumps the key's version, which callers can use
+    to memoize work derived from the value.
+    """
+
+    def __init__(self, ttl=TTL_SECONDS, max_bytes=MAX_BYTES, refresh_workers=4):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._versions = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="cache-refresh")
+
+    def get(self, key, loader, pinned=False):
+        return self.get_versioned(key, loader, pinned)[0]
+
+    def get_versioned(self, key, loader, pinned=False):
+        """
+        Same as get, but also returns the version of the value that was served.
+        Returns:
+        - (value, version)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if time.monotonic() - entry.loaded_at > self.ttl and entry.refresh is None:
+                    entry.refresh = self._executor.submit(self._refresh, key, loader, pinned)
+                return entry.value, entry.version
+
+            future = self._loading.get(key)
+            owner = future is None
+            if owner:
+                future = self._loading[key] = Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = loader()
+        except BaseException as exc:
+            with self._lock:
+                self._loading.pop(key, None)
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self._loading.pop(key, None)
+            version = self._store(key, value, pinned)
+        future.set_result((value, version))
+        return value, version
+
+    def version(self, key):
+        with self._lock:
+            return self._versions.get(key, 0)
+
+    def contains(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def _refresh(self, key, loader, pinned):
+        try:
+            value = loader()
+        except Exception:
+            logger.exception("Background refresh of %r failed, keeping the stale value", key)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refresh = None
+            return
+        with self._lock:
+            self._store(key, value, pinned)
+
+    def _store(self, key, value, pinned):
+        old = self._entries.pop(key, None)
+        if old is not None and not old.pinned:
+            self._bytes -= old.size
+        version = self._versions.get(key, 0) + 1
+        self._versions[key] = version
+        entry = self._entries[key] = _Entry(value, version, pinned)
+        if not pinned:
+            self._bytes += entry.size
+            self._evict()
+        return version
+
+    def _evict(self):
+        # Least recently used first; the newest entry stays even if it alone exceeds the budget
+        for key in list(self._entries):
+            if self._bytes <= self.max_bytes or len(self._entries) <= 1:
+                break
+            entry = self._entries[key]
+            if entry.pinned or key == next(reversed(self._entries)):
+                continue
+            del self._entries[key]
+            self._bytes -= entry.size
+
+
+# One instance per server process
+cache = SWRCache()
+
+
+# Keys of the per-event entries end with the event, so every event is cached separately
+
+def get_players_page(page=0, event=DEFAULT_EVENT):
+    """
+    Returns:
+    - ((rows, total), version) for one leaderboard page of `event`
+    """
+    return cache.get_versioned(("players", page, event),
+                               lambda: get_source().latest_players(page, event=event), pinned=True)
+
+def get_competitions_page(page=0, event=DEFAULT_EVENT):
+    return cache.get_versioned(("competitions", page, event),
+                               lambda: get_source().latest_competitions(page, event=event), pinned=True)
+
+def get_cached_players(page=0, event=DEFAULT_EVENT):
+    return get_players_page(page, event)[0]
+
+def get_cached_competitions(page=0, event=DEFAULT_EVENT):
+    return get_competitions_page(page, event)[0]
+
+def get_cached_player_history(person_id, event=DEFAULT_EVENT):
+    return cache.get(("player_history", person_id, event), lambda: get_source().player_history(person_id, event))
+
+def get_cached_players_history(person_ids, event=DEFAULT_EVENT):
+    person_ids = tuple(sorted(person_ids))
+    return cache.get(("players_history", person_ids, event), lambda: get_source().players_history(person_ids, event))
+
+def get_cached_competition_history(comp_id, event=DEFAULT_EVENT):
+    return cache.get(("competition_history", comp_id, event), lambda: get_source().competition_history(comp_id, event))
+
+def get_cached_competition_metadata(comp_id):
+    return cache.get(("competition_metadata", comp_id), lambda: get_source().competition_metadata(comp_id))
+
+def get_cached_dataset_version(event=DEFAULT_EVENT):
+    return cache.get(("dataset_version", event), lambda: get_source().dataset_version(event))
+
+def get_search_entries(event=DEFAULT_EVENT):
+    """
+    Returns:
+    - ((players, competitions), version) id/name projections for the search index of `event`
+    """
+    return cache.get_versioned(("search_entries", event), lambda: get_source().search_entries(event), pinned=True)
+
+
+############
+### Warmup and prefetch
+############
+
+_warmup_started = False
+_warmup_lock = threading.Lock()
+
+
+def _warm_up(top_n):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=WARMUP_WORKERS, thread_name_prefix="cache-warmup") as pool:
+        players_page = pool.submit(get_cached_players)
+        competitions_page = pool.submit(get_cached_competitions)
+        (players, _), (competitions, _) = players_page.result(), competitions_page.result()
+
+        loads = [pool.submit(get_cached_player_history, person_id) for person_id in players["id"][:top_n]]
+        for comp_id in competitions["comp_id"][:top_n]:
+            loads.append(pool.submit(get_cached_competition_history, comp_id))
+            loads.append(pool.submit(get_cached_competition_metadata, comp_id))
+        failed = sum(1 for future in loads if future.exception() is not None)
+    logger.info("Cache warmup done in %.1fs (%d detail loads, %d failed)", time.perf_counter() - started, len(loads), failed)
+
+
+def warm_up(top_n=WARMUP_TOP_N):
+    """
+    Load both leaderboards of the default event and the top `top_n` player and
+    competition detail pages in a background thread. Only the first call in the process does anything,
+    so it is safe to call on every script run.
+    """
+    global _warmup_started
+    with _warmup_lock:
+        if _warmup_started:
+            return
+        _warmup_started = True
+
+    def run():
+        try:
+            _warm_up(top_n)
+        except Exception:
+            logger.exception("Cache warmup failed")
+
+    threading.Thread(target=run, name="cache-warmup", daemon=True).start()
+
+
+def prefetch_player(person_id, event=DEFAULT_EVENT):
+    """
+    Start loading a player's history while their row is selected, so the detail page renders from cache.
+    """
+    key = ("player_history", person_id, event)
+    if not cache.contains(key):
+        prefetch(lambda: get_cached_player_history(person_id, event), key)
+
+def prefetch_competition(comp_id, event=DEFAULT_EVENT):
+    history_key = ("competition_history", comp_id, event)
+    if not cache.contains(history_key):
+        prefetch(lambda: get_cached_competition_history(comp_id, event), history_key)
+    metadata_key = ("competition_metadata", comp_id)
+    if not cache.contains(metadata_key):
+        prefetch(lambda: get_cached_competition_metadata(comp_id), metadata_key)
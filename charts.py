@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+# Points kept per trace, about what a full-width chart can show
+MAX_POINTS = 500
+
+
+def lttb(x, y, threshold=MAX_POINTS):
+    """
+    Largest-Triangle-Three-Buckets downsampling. Keeps the first and last points
+    and, from each bucket in between, the point forming the largest triangle with
+    the previously kept point and the average of the next bucket, so peaks and
+    drops survive.
+    Returns:
+    - sorted positions of the kept points
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # threshold - 2 buckets over [1, n - 1); the last point is its own final bucket
+    edges = np.append(np.linspace(1, n - 1, threshold - 1).astype(np.int64), n)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for b in range(threshold - 2):
+        start, end, next_end = edges[b], edges[b + 1], edges[b + 2]
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[b + 1] = a
+    return kept
+
+
+def downsample(df, x, y, threshold=MAX_POINTS):
+    """
+    Rows of `df` to plot for the `y` series over the date column `x`:
+    missing values dropped, then LTTB.
+    """
+    df = df[df[y].notna()]
+    x_values = pd.to_datetime(df[x]).to_numpy().astype(np.int64)
+    return df.iloc[lttb(x_values, df[y].to_numpy(), threshold)]
@@ -0,0 +1,261 @@
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+import api
+from api import (
+    COMPARE_COLUMNS,
+    COMPETITION_COLUMNS,
+    COMPETITION_DTYPES,
+    DEFAULT_EVENT,
+    LEADERBOARD_PAGE_SIZE,
+    METRIC_COLUMNS,
+    PLAYER_COLUMNS,
+    PLAYER_DTYPES,
+    dtypes_for,
+    rank_column,
+)
+
+
+# Rows per chunk of the bulk player_metrics export
+EXPORT_CHUNK_SIZE = 50000
+
+
+class DataSource:
+    """
+    Everything the dashboard reads. Leaderboard pages and player histories are
+    typed DataFrames; the small lookups are lists of dicts, as PostgREST returns them.
+    Rankings are read for one WCA event (api.EVENTS), competitions are shared by all.
+    """
+
+    def latest_players(self, page=0, page_size=LEADERBOARD_PAGE_SIZE, event=DEFAULT_EVENT):
+        """
+        Returns:
+        - (frame, total) for one page of the players leaderboard of `event`
+        """
+        raise NotImplementedError
+
+    def latest_competitions(self, page=0, page_size=LEADERBOARD_PAGE_SIZE, event=DEFAULT_EVENT):
+        raise NotImplementedError
+
+    def player_by_id(self, person_id, event=DEFAULT_EVENT):
+        raise NotImplementedError
+
+    def competition_by_id(self, comp_id):
+        raise NotImplementedError
+
+    def player_history(self, person_id, event=DEFAULT_EVENT):
+        raise NotImplementedError
+
+    def players_history(self, person_ids, event=DEFAULT_EVENT):
+        raise NotImplementedError
+
+    def competition_history(self, comp_id, event=DEFAULT_EVENT):
+        raise NotImplementedError
+
+    def competition_metadata(self, comp_id):
+        raise NotImplementedError
+
+    def dataset_version(self, event=DEFAULT_EVENT):
+        """
+        Returns:
+        - fingerprint of the player_metrics rows of `event` (changes only when they do), or None if unknown
+        """
+        raise NotImplementedError
+
+    def search_entries(self, event=DEFAULT_EVENT):
+        """
+        Returns:
+        - (players, competitions) id/name projections of both leaderboards of `event`
+        """
+        raise NotImplementedError
+
+    def player_metrics_chunks(self, event=DEFAULT_EVENT, chunk_size=EXPORT_CHUNK_SIZE):
+        """
+        The player_metrics rows of `event` ordered by personId, date, as a generator
+        of typed DataFrames of about `chunk_size` rows.
+        """
+        raise NotImplementedError
+
+
+class SupabaseSource(DataSource):
+    """
+    The hosted PostgREST API (see api.py).
+    """
+
+    def latest_players(self, page=0, page_size=LEADERBOARD_PAGE_SIZE, event=DEFAULT_EVENT):
+        return api.fetch_latest_players(page, page_size, event)
+
+    def latest_competitions(self, page=0, page_size=LEADERBOARD_PAGE_SIZE, event=DEFAULT_EVENT):
+        return api.fetch_latest_competitions(page, page_size, event)
+
+    def player_by_id(self, person_id, event=DEFAULT_EVENT):
+        return api.fetch_player_by_id(person_id, event)
+
+    def competition_by_id(self, comp_id):
+        return api.fetch_competition_by_id(comp_id)
+
+    def player_history(self, person_id, event=DEFAULT_EVENT):
+        return api.fetch_player_history(person_id, event)
+
+    def players_history(self, person_ids, event=DEFAULT_EVENT):
+        return api.fetch_players_history(person_ids, event)
+
+    def competition_history(self, comp_id, event=DEFAULT_EVENT):
+        return api.fetch_competition_history(comp_id, event)
+
+    def competition_metadata(self, comp_id):
+        return api.fetch_competition_metadata(comp_id)
+
+    def dataset_version(self, event=DEFAULT_EVENT):
+        return api.fetch_dataset_version(event)
+
+    def search_entries(self, event=DEFAULT_EVENT):
+        return api.fetch_search_entries(event)
+
+    def player_metrics_chunks(self, event=DEFAULT_EVENT, chunk_size=EXPORT_CHUNK_SIZE):
+        # Keyset pagination on the (event, personId, date) primary key: every page is an
+        # index seek past the last row read, with no row count and no OFFSET to scan through
+        page_size = api.BULK_PAGE_SIZE
+        params = {"event": f"eq.{event}", "select": ",".join(METRIC_COLUMNS),
+                  "order": "personId.asc,date.asc", "limit": page_size}
+        dtypes = dtypes_for(METRIC_COLUMNS)
+        pages, rows = [], 0
+        while True:
+            page = api.get_frame("player_metrics", params, dtypes)
+            if len(page):
+                pages.append(page)
+                rows += len(page)
+            last_page = len(page) < page_size
+            if pages and (rows >= chunk_size or last_page):
+                yield pd.concat(pages, ignore_index=True)
+                pages, rows = [], 0
+            if last_page:
+                return
+            person_id, date = page["personId"].iloc[-1], page["date"].iloc[-1]
+            params["or"] = f'(personId.gt."{person_id}",and(personId.eq."{person_id}",date.gt."{date}"))'
+
+
+def _columns(columns):
+    return ", ".join(f'"{column}"' for column in columns)
+
+
+class LocalSource(DataSource):
+    """
+    SQLite file written by `fetch-data/historical.py --export`: the same tables
+    as Supabase plus the latest_* views materialized as indexed tables, so every
+    lookup is an index seek with no network round trip.
+    Each thread gets its own read-only connection, reopened when a new export
+    replaces the file (an open connection keeps reading the replaced one).
+    """
+
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Local database {path} not found, create it with historical.py --export")
+        self.path = path
+        self._local = threading.local()
+
+    def _file_id(self):
+        stat = os.stat(self.path)
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        file_id = self._file_id()
+        if conn is not None and self._local.file_id != file_id:
+            conn.close()
+            conn = None
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.file_id = file_id
+        return conn
+
+    def _frame(self, sql, params, dtypes):
+        return pd.read_sql_query(sql, self._conn(), params=params, dtype=dtypes)
+
+    def _records(self, sql, params=()):
+        cursor = self._conn().execute(sql, params)
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def _count(self, table, event):
+        return self._conn().execute(f"select count(*) from {table} where event = ?", (event,)).fetchone()[0]
+
+    def latest_players(self, page=0, page_size=LEADERBOARD_PAGE_SIZE, event=DEFAULT_EVENT):
+        # "is null" first keeps Postgres' nulls-last ordering
+        rank = rank_column(event)
+        sql = (f"select {_columns(PLAYER_COLUMNS)} from latest_player_metrics where event = ? "
+               f"order by {rank} is null, {rank}, id limit ? offset ?")
+        frame = self._frame(sql, (event, page_size, page * page_size), PLAYER_DTYPES)
+        return frame, self._count("latest_player_metrics", event)
+
+    def latest_competitions(self, page=0, page_size=LEADERBOARD_PAGE_SIZE, event=DEFAULT_EVENT):
+        sql = (f"select {_columns(COMPETITION_COLUMNS)} from latest_competition_ranking where event = ? "
+               "order by rank365avg_avg is null, rank365avg_avg, competition_id limit ? offset ?")
+        frame = self._frame(sql, (event, page_size, page * page_size), COMPETITION_DTYPES)
+        return frame, self._count("latest_competition_ranking", event)
+
+    def player_by_id(self, person_id, event=DEFAULT_EVENT):
+        sql = 'select "personId" from player_metrics where event = ? and "personId" = ? limit 1'
+        return self._records(sql, (event, person_id))
+
+    def competition_by_id(self, comp_id):
+        return self._records("select comp_id, name from competitions where comp_id = ? limit 1", (comp_id,))
+
+    def player_history(self, person_id, event=DEFAULT_EVENT):
+        sql = f'select {_columns(METRIC_COLUMNS)} from player_metrics where event = ? and "personId" = ? order by date'
+        return self._frame(sql, (event, person_id), dtypes_for(METRIC_COLUMNS))
+
+    def players_history(self, person_ids, event=DEFAULT_EVENT):
+        columns = ["personId", "date"] + COMPARE_COLUMNS
+        placeholders = ", ".join("?" for _ in person_ids)
+        sql = (f'select {_columns(columns)} from player_metrics '
+               f'where event = ? and "personId" in ({placeholders}) order by "personId", date')
+        return self._frame(sql, (event,) + tuple(person_ids), dtypes_for(columns))
+
+    def competition_history(self, comp_id, event=DEFAULT_EVENT):
+        return self._records("select * from competition_ranking where event = ? and comp_id = ?", (event, comp_id))
+
+    def competition_metadata(self, comp_id):
+        return self._records("select id, name, city, country, date_from from competitions where comp_id = ?", (comp_id,))
+
+    def dataset_version(self, event=DEFAULT_EVENT):
+        try:
+            rows = self._records("select version from dataset_versions where event = ?", (event,))
+        except sqlite3.OperationalError:  # exported before dataset_versions existed
+            return None
+        return rows[0]["version"] if rows else None
+
+    def search_entries(self, event=DEFAULT_EVENT):
+        players = self._records("select id, name from latest_player_metrics where event = ? order by id", (event,))
+        competitions = self._records("select competition_id, comp_id, name from latest_competition_ranking "
+                                     "where event = ? order by competition_id", (event,))
+        return players, competitions
+
+    def player_metrics_chunks(self, event=DEFAULT_EVENT, chunk_size=EXPORT_CHUNK_SIZE):
+        # A dedicated connection: the generator may be consumed from another thread
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            sql = f'select {_columns(METRIC_COLUMNS)} from player_metrics where event = ? order by "personId", date'
+            yield from pd.read_sql_query(sql, conn, params=(event,), dtype=dtypes_for(METRIC_COLUMNS), chunksize=chunk_size)
+        finally:
+            conn.close()
+
+
+_source = None
+_source_lock = threading.Lock()
+
+
+def get_source():
+    """
+    The process-wide data source: LocalSource when WCA_LOCAL_DB (environment)
+    or LOCAL_DB (secrets) points at an exported SQLite file, Supabase otherwise.
+    """
+    global _source
+    with _source_lock:
+        if _source is None:
+            path = os.environ.get("WCA_LOCAL_DB") or api.secret("LOCAL_DB")
+            _source = LocalSource(path) if path else SupabaseSource()
+        return _source
@@ -0,0 +1,101 @@
+import glob
+import os
+import tempfile
+import threading
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+from api import DEFAULT_EVENT
+from cache import cache
+from data_source import get_source
+
+FORMATS = {
+    "csv": ("📄 Download Data as CSV", "text/csv"),
+    "parquet": ("📦 Download Data as Parquet", "application/vnd.apache.parquet"),
+}
+
+# Bulk exports are written here chunk by chunk, one file per event, format and dataset version
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "wca-exports")
+
+
+def frame_bytes(frame, fmt):
+    if fmt == "csv":
+        return frame.to_csv(index=False).encode("utf-8")
+    return frame.to_parquet(index=False)
+
+
+def download_buttons(frame, version_key, file_stem):
+    """
+    CSV and Parquet download buttons for `frame`. The file is only serialized
+    when a button is clicked, and kept in the shared cache under `version_key`
+    (which must change whenever the data behind `frame` does).
+    """
+    for column, (fmt, (label, mime)) in zip(st.columns(len(FORMATS)), FORMATS.items()):
+        column.download_button(
+            label,
+            lambda fmt=fmt: cache.get(("export", fmt) + version_key, lambda: frame_bytes(frame, fmt)),
+            f"{file_stem}.{fmt}",
+            mime,
+            key=f"download_{file_stem}_{fmt}",
+            on_click="ignore",
+        )
+
+
+############
+### Bulk export of all player metrics
+############
+
+_bulk_lock = threading.Lock()
+
+
+def _write_chunks(chunks, path, fmt):
+    """
+    Append each DataFrame of `chunks` to `path`, so only one chunk is in memory at a time.
+    """
+    writer = None
+    with open(path, "wb") as f:
+        for i, chunk in enumerate(chunks):
+            if fmt == "csv":
+                chunk.to_csv(f, index=False, header=i == 0)
+                continue
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(f, table.schema, compression="zstd")
+            writer.write_table(table.cast(writer.schema))
+        if writer is not None:
+            writer.close()
+
+
+def bulk_export(fmt, version, event=DEFAULT_EVENT):
+    """
+    The player_metrics rows of `event` as bytes. The file is built from the data
+    source the first time it is requested for this dataset `version`, one chunk of
+    rows at a time, and reused afterwards; older versions of it are removed.
+    The chunks only bound the build: st.download_button needs the whole file in memory.
+    """
+    path = os.path.join(EXPORT_DIR, f"player_metrics-{event}-{version}.{fmt}")
+    with _bulk_lock:
+        if not os.path.exists(path):
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            _write_chunks(get_source().player_metrics_chunks(event), tmp_path, fmt)
+            os.replace(tmp_path, path)
+            for old in glob.glob(os.path.join(EXPORT_DIR, f"player_metrics-{event}-*.{fmt}")):
+                if old != path:
+                    os.remove(old)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def bulk_download_buttons(version, event=DEFAULT_EVENT):
+    for column, (fmt, (_, mime)) in zip(st.columns(len(FORMATS)), FORMATS.items()):
+        column.download_button(
+            f"⬇️ Download all player metrics ({fmt.upper()})",
+            lambda fmt=fmt: bulk_export(fmt, version, event),
+            f"player_metrics-{event}.{fmt}",
+            mime,
+            key=f"download_all_{fmt}",
+            on_click="ignore",
+        )
@@ -0,0 +1,232 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from pipeline import (
+    clean_results,
+    compute_competition_ranking,
+    compute_rankings,
+    compute_records,
+    select_top_persons,
+)
+from checkpoint import FrameParts, save_parts
+from profiling import profiler
+from shards import (
+    ROW_GROUP_SIZE,
+    plan_shards,
+    sharded_competition_ranking,
+    sharded_rankings,
+    sharded_records,
+)
+from synthetic import generate
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SIZES = [1000, 20000, 100000]
+
+
+############
+### One run
+############
+
+def run_sharded(result_df, comps_df, comps2011_df, persons_df, memory_budget_mb):
+    """
+    The stages of historical.py --all-persons, writing their parts to a temporary directory.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        n_shards = plan_shards(result_df, comps_df, memory_budget_mb)
+        with profiler.stage('records', rows_in=len(result_df)) as stage:
+            save_parts(os.path.join(directory, 'records'), sharded_records(result_df, comps_df, n_shards), ROW_GROUP_SIZE)
+            record_parts = FrameParts(os.path.join(directory, 'records'))
+            stage['rows_out'] = len(record_parts)
+
+        with profiler.stage('ranking', rows_in=len(record_parts)) as stage:
+            save_parts(os.path.join(directory, 'ranking'), sharded_rankings(record_parts, persons_df, memory_budget_mb))
+            ranking_parts = FrameParts(os.path.join(directory, 'ranking'))
+            stage['rows_out'] = len(ranking_parts)
+
+        with profiler.stage('comp_ranking', rows_in=len(comps2011_df)) as stage:
+            comp_ranking_df = sharded_competition_ranking(comps2011_df, result_df, ranking_parts, record_parts)
+            stage['rows_out'] = len(comp_ranking_df)
+
+
+def run_pipeline(n_persons, seed=0, all_persons=False, memory_budget_mb=None):
+    """
+    Run every computing stage of historical.py on synthetic data of `n_persons`
+    persons, under the stage profiler: for the top persons, every person, or
+    every person in shards that fit `memory_budget_mb`.
+    Returns:
+    - dict with the data sizes and one profiler entry per stage
+    """
+    comps_df, persons_df, raw_results = generate(n_persons, seed=seed)
+    profiler.reset()
+
+    with profiler.stage('results', rows_in=len(raw_results)) as stage:
+        result_df = clean_results(raw_results)
+        stage['rows_out'] = len(result_df)
+    del raw_results
+
+    comps2011_df = comps_df[comps_df['date_from'] >= pd.Timestamp('2011-01-01')]
+    if memory_budget_mb is not None:
+        run_sharded(result_df, comps_df, comps2011_df, persons_df, memory_budget_mb)
+        return run_report(n_persons, comps_df, result_df)
+
+    with profiler.stage('records', rows_in=len(result_df)) as stage:
+        persons = result_df['personId'].unique() if all_persons else select_top_persons(result_df)
+        record_df = compute_records(result_df, comps_df, persons)
+        stage['rows_out'] = len(record_df)
+
+    with profiler.stage('ranking', rows_in=len(record_df)) as stage:
+        ranking_df = compute_rankings(record_df, persons_df)
+        stage['rows_out'] = len(ranking_df)
+
+    with profiler.stage('comp_ranking', rows_in=len(comps2011_df)) as stage:
+        comp_ranking_df = compute_competition_ranking(comps2011_df, result_df, ranking_df, record_df)
+        stage['rows_out'] = len(comp_ranking_df)
+
+    return run_report(n_persons, comps_df, result_df)
+
+
+def run_report(n_persons, comps_df, result_df):
+    return {
+        'n_persons': n_persons,
+        'n_competitions': len(comps_df),
+        'n_results': len(result_df),
+        'stages': profiler.report()['stages'],
+    }
+
+
+def run_isolated(n_persons, seed, all_persons=False, memory_budget_mb=None):
+    # A fresh process per size, so peak RSS is not inflated by the previous size
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(run_pipeline, n_persons, seed, all_persons, memory_budget_mb).result()
+
+
+############
+### Reports
+############
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=SCRIPT_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f'{commit}-dirty' if dirty else commit
+
+
+def stage_times(run):
+    """
+    Timings of a run by stage name. Stages repeated per shard or date block are combined:
+    their wall and CPU times add up, their peak memory is the largest one.
+    """
+    times = {}
+    for entry in run['stages']:
+        total = times.get(entry['stage'])
+        if total is None:
+            times[entry['stage']] = dict(entry)
+            continue
+        for metric in ['wall_s', 'cpu_s']:
+            total[metric] = round(total.get(metric, 0) + entry.get(metric, 0), 3)
+        total['peak_rss_mb'] = max(total.get('peak_rss_mb', 0), entry.get('peak_rss_mb', 0))
+    return times
+
+
+def scaling_table(runs, metric='wall_s'):
+    """
+    One line per stage: `metric` at every size, and the scaling exponent k of
+    time ~ persons^k between the two largest sizes.
+    """
+    runs = sorted(runs, key=lambda run: run['n_persons'])
+    stages = list(stage_times(runs[-1]))
+    header = f"{'stage':<20}" + ''.join(f"{run['n_persons']:>12,}" for run in runs) + f"{'exponent':>10}"
+    lines = [header, '-' * len(header)]
+    for name in stages:
+        values = [stage_times(run).get(name, {}).get(metric) for run in runs]
+        cells = ''.join(f'{v:>12.2f}' if v is not None else f"{'':>12}" for v in values)
+        exponent = ''
+        if len(runs) > 1 and values[-1] and values[-2]:
+            exponent = f"{math.log(values[-1] / values[-2]) / math.log(runs[-1]['n_persons'] / runs[-2]['n_persons']):>10.2f}"
+        lines.append(f'{name:<20}{cells}{exponent}')
+    return '\n'.join(lines)
+
+
+def comparison_table(runs, baseline_runs, metric='wall_s'):
+    """
+    Ratio current / baseline of `metric` per stage and size (below 1 is faster).
+    """
+    baseline = {run['n_persons']: stage_times(run) for run in baseline_runs}
+    runs = sorted((run for run in runs if run['n_persons'] in baseline), key=lambda run: run['n_persons'])
+    if not runs:
+        return 'No size in common with the baseline'
+    header = f"{'stage':<20}" + ''.join(f"{run['n_persons']:>12,}" for run in runs)
+    lines = [header, '-' * len(header)]
+    for name in stage_times(runs[-1]):
+        cells = ''
+        for run in runs:
+            current = stage_times(run).get(name, {}).get(metric)
+            before = baseline[run['n_persons']].get(name, {}).get(metric)
+            cells += f'{current / before:>11.2f}x' if current and before else f"{'':>12}"
+        lines.append(f'{name:<20}{cells}')
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory-profile the pipeline stages on synthetic WCA data")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="numbers of persons to run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--all-persons', action='store_true', help="rank every person instead of the top persons")
+    parser.add_argument('--memory-budget', type=int, metavar='MB',
+                        help="rank every person in shards that fit this memory (historical.py --all-persons)")
+    parser.add_argument('--output-dir', default=os.path.join(SCRIPT_DIR, 'benchmarks'),
+                        help="where the JSON report of each run is written")
+    parser.add_argument('--compare', metavar='REPORT_JSON', help="earlier report to compare against")
+    args = parser.parse_args()
+
+    runs = []
+    for n_persons in args.sizes:
+        print(f"Running {n_persons:,} persons...")
+        runs.append(run_isolated(n_persons, args.seed, args.all_persons, args.memory_budget))
+
+    report = {
+        'commit': git_commit(),
+        'written_at': datetime.now().isoformat(timespec='seconds'),
+        'seed': args.seed,
+        'all_persons': args.all_persons or args.memory_budget is not None,
+        'memory_budget_mb': args.memory_budget,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'runs': runs,
+    }
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"benchmark-{report['commit']}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+
+    print('\nWall time (s)')
+    print(scaling_table(runs))
+    print('\nPeak RSS (MB)')
+    print(scaling_table(runs, 'peak_rss_mb'))
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nWall time vs {baseline['commit']}")
+        print(comparison_table(runs, baseline['runs']))
+    print(f"\nReport written to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+import hashlib
+import os
+import shutil
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# Pipeline stages, in execution order
+STAGES = ['competitions', 'persons', 'results', 'records', 'ranking', 'comp_ranking']
+
+# Stages stored as one Parquet file per year of `date`.
+# Frames that are not date-major get their row order back by re-sorting on load.
+YEAR_PARTITIONED = {
+    'records': ['personId', 'date'],
+    'ranking': None,
+}
+
+
+############
+### Parquet frames
+############
+
+def save_frame(path, df, year_column=None):
+    """
+    Write `df` as typed Parquet under the directory `path`: one file per year of
+    `year_column`, or a single file. The directory is swapped in atomically.
+    """
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    if year_column is None or df.empty:
+        parts = [('all', df)]
+    else:
+        years = df[year_column].dt.year
+        parts = [(str(year), df[years == year]) for year in sorted(years.unique())]
+
+    for name, part in parts:
+        table = pa.Table.from_pandas(part, preserve_index=False)
+        pq.write_table(table, os.path.join(tmp_path, f'part-{name}.parquet'), compression='zstd')
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+def load_frame(path, sort_by=None):
+    """
+    Read a frame written by save_frame, memory-mapping the Parquet files.
+    """
+    files = sorted(f for f in os.listdir(path) if f.endswith('.parquet'))
+    tables = [pq.read_table(os.path.join(path, f), memory_map=True) for f in files]
+    df = pa.concat_tables(tables).to_pandas()
+    if sort_by is not None:
+        df = df.sort_values(sort_by, kind='stable').reset_index(drop=True)
+    return df
+
+
+def frame_exists(path):
+    return os.path.isdir(path)
+
+
+def save_parts(path, frames, row_group_size=None):
+    """
+    Write every DataFrame of the iterable `frames` as its own Parquet file under
+    the directory `path` as soon as it is produced, so a frame too large for
+    memory can be written part by part. Smaller row groups let filtered reads
+    skip more of a file. The directory is swapped in atomically.
+    Returns:
+    - number of rows written
+    """
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    rows = 0
+    for i, part in enumerate(frames):
+        table = pa.Table.from_pandas(part, preserve_index=False)
+        pq.write_table(table, os.path.join(tmp_path, f'part-{i:05d}.parquet'), compression='zstd',
+                       row_group_size=row_group_size)
+        rows += len(part)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return rows
+
+
+class FrameParts:
+    """
+    A frame written by save_frame or save_parts, read one Parquet file at a time:
+    iterating yields the parts in file order (again on every iteration), and
+    len() is the total number of rows, read from the file footers.
+    """
+
+    def __init__(self, path):
+        self.files = [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith('.parquet')]
+
+    def __iter__(self):
+        return self.read()
+
+    def read(self, columns=None, filters=None):
+        """
+        Parts one at a time, with only `columns` and the rows matching the
+        pyarrow `filters` (row groups whose statistics exclude them are skipped).
+        """
+        for f in self.files:
+            yield pq.read_table(f, columns=columns, filters=filters, memory_map=True).to_pandas()
+
+    def __len__(self):
+        return sum(pq.ParquetFile(f).metadata.num_rows for f in self.files)
+
+    def fingerprint(self):
+        """
+        Hash of the files' contents: it changes whenever the frame does.
+        """
+        digest = hashlib.sha1()
+        for f in self.files:
+            with open(f, 'rb') as part:
+                for block in iter(lambda: part.read(2 ** 20), b''):
+                    digest.update(block)
+        return digest.hexdigest()[:16]
+
+
+############
+### Stage checkpoints
+############
+
+class StageStore:
+    """
+    Parquet checkpoint of every pipeline stage output, so a run can pick up
+    where a previous one stopped.
+
+    - resume_from: reuse the checkpoints of all stages before this one
+    - rerun: recompute only these stages, reuse the checkpoints of all others
+    Without either, every stage is recomputed (and checkpointed).
+    """
+
+    def __init__(self, directory, resume_from=None, rerun=None):
+        self.directory = directory
+        self.resume_from = resume_from
+        self.rerun = set(rerun or [])
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, stage):
+        return os.path.join(self.directory, stage)
+
+    def should_reuse(self, stage):
+        if self.rerun:
+            return stage not in self.rerun
+        if self.resume_from is not None:
+            return STAGES.index(stage) < STAGES.index(self.resume_from)
+        return False
+
+    def save(self, stage, df):
+        year_column = 'date' if stage in YEAR_PARTITIONED else None
+        save_frame(self.path(stage), df, year_column)
+
+    def load(self, stage):
+        return load_frame(self.path(stage), sort_by=YEAR_PARTITIONED.get(stage))
+
+    def parts(self, stage):
+        return FrameParts(self.path(stage))
+
+    def run(self, stage, func):
+        """
+        Returns:
+        - the stage output, loaded from its checkpoint when it may be reused,
+          otherwise computed with `func()` and checkpointed
+        """
+        if self.should_reuse(stage):
+            if frame_exists(self.path(stage)):
+                print(f"[{stage}] loaded from checkpoint")
+                return self.load(stage)
+            print(f"[{stage}] no checkpoint found, recomputing")
+        df = func()
+        self.save(stage, df)
+        return df
+
+    def run_parts(self, stage, func, row_group_size=None):
+        """
+        Same as run for a stage too large for memory: `func()` yields the output
+        part by part, each written as it comes (see save_parts).
+        Returns:
+        - the stage output as FrameParts
+        """
+        if self.should_reuse(stage):
+            if frame_exists(self.path(stage)):
+                print(f"[{stage}] loaded from checkpoint")
+                return self.parts(stage)
+            print(f"[{stage}] no checkpoint found, recomputing")
+        save_parts(self.path(stage), func(), row_group_size)
+        return self.parts(stage)
@@ -0,0 +1,127 @@
+import os
+import shutil
+
+import pandas as pd
+
+from checkpoint import StageStore
+from incremental import load_state, run_incremental, save_state
+from pipeline import (
+    compute_competition_ranking,
+    compute_rankings,
+    compute_records,
+    filter_by_event,
+    ranked_metric,
+    select_top_persons,
+)
+from profiling import profiler
+from shards import (
+    DEFAULT_MEMORY_BUDGET_MB,
+    ROW_GROUP_SIZE,
+    plan_shards,
+    sharded_competition_ranking,
+    sharded_rankings,
+    sharded_records,
+)
+
+
+def event_store(checkpoint_dir, event, resume_from=None, rerun=None):
+    """
+    Checkpoints of the per-event stages (results, records, ranking, comp_ranking),
+    one directory per event next to the shared competitions / persons stages.
+    """
+    return StageStore(os.path.join(checkpoint_dir, 'events', event), resume_from=resume_from, rerun=rerun)
+
+
+def run_event(event, checkpoint_dir, state_dir, resume_from=None, rerun=None, incremental=False,
+              all_persons=False, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    """
+    Records, rankings and competition ranking of one event, meant to run in a
+    worker process. The inputs are read from the checkpoints written by the
+    parent (competitions, persons and this event's results) and the outputs
+    are checkpointed, so only the profile goes back through the pool.
+    With all_persons, every person is ranked instead of the top TOP_PERSONS,
+    in shards that fit `memory_budget_mb` (see shards.py).
+    Returns:
+    - the profiler stages of this run
+    """
+    # A worker process may run several events
+    profiler.reset()
+    shared = StageStore(checkpoint_dir)
+    store = event_store(checkpoint_dir, event, resume_from, rerun)
+    filtered_df = filter_by_event(shared.load('competitions'), event)
+    persons_df = shared.load('persons')
+    result_df = store.load('results')
+    filtered2011_df = filtered_df[pd.to_datetime(filtered_df['date_from']) >= pd.Timestamp('2011-01-01')]
+    metric = ranked_metric(event)
+
+    event_state_dir = os.path.join(state_dir, event)
+    state = load_state(event_state_dir) if incremental else None
+    incremental_output = {}
+
+    def run_stage(stage, func, rows_in=None):
+        with profiler.stage(stage, rows_in=rows_in) as entry:
+            df = store.run(stage, func)
+            entry['rows_out'] = len(df)
+        return df
+
+    if all_persons:
+        _run_sharded(store, run_stage, result_df, filtered_df, filtered2011_df, persons_df, memory_budget_mb, metric)
+        # The saved state only covers the top persons: the next --incremental run starts over
+        shutil.rmtree(event_state_dir, ignore_errors=True)
+        return profiler.report()['stages']
+
+    def build_records():
+        if state is not None:
+            # Only recompute the persons / weeks / competitions touched by new results
+            record_df, ranking_df, comp_ranking_df = run_incremental(
+                state, result_df, filtered_df, filtered2011_df, persons_df, metric
+            )
+            incremental_output.update(ranking=ranking_df, comp_ranking=comp_ranking_df)
+            return record_df
+        return compute_records(result_df, filtered_df, select_top_persons(result_df, metric=metric))
+
+    record_df = run_stage('records', build_records, rows_in=len(result_df))
+
+    def build_ranking():
+        if 'ranking' in incremental_output:
+            return incremental_output['ranking']
+        return compute_rankings(record_df, persons_df)
+
+    ranking_df = run_stage('ranking', build_ranking, rows_in=len(record_df))
+
+    def build_comp_ranking():
+        if 'comp_ranking' in incremental_output:
+            return incremental_output['comp_ranking']
+        return compute_competition_ranking(filtered2011_df, result_df, ranking_df, record_df, metric)
+
+    comp_ranking_df = run_stage('comp_ranking', build_comp_ranking, rows_in=len(filtered2011_df))
+
+    # Checkpoint for the next --incremental run
+    with profiler.stage('save_state'):
+        save_state(
+            event_state_dir,
+            result_df=result_df,
+            filtered_df=filtered_df[['id', 'date_from']],
+            record_df=record_df,
+            ranking_df=ranking_df,
+            comp_ranking_df=comp_ranking_df,
+        )
+    return profiler.report()['stages']
+
+
+def _run_sharded(store, run_stage, result_df, filtered_df, filtered2011_df, persons_df, memory_budget_mb, metric):
+    # Records by shard of persons, rankings by block of dates: neither is ever fully in memory
+    def run_parts(stage, func, rows_in, row_group_size=None):
+        with profiler.stage(stage, rows_in=rows_in) as entry:
+            parts = store.run_parts(stage, func, row_group_size)
+            entry['rows_out'] = len(parts)
+        return parts
+
+    n_shards = plan_shards(result_df, filtered_df, memory_budget_mb)
+    record_parts = run_parts('records', lambda: sharded_records(result_df, filtered_df, n_shards),
+                             len(result_df), ROW_GROUP_SIZE)
+    ranking_parts = run_parts('ranking', lambda: sharded_rankings(record_parts, persons_df, memory_budget_mb),
+                              len(record_parts))
+    run_stage('comp_ranking',
+              lambda: sharded_competition_ranking(filtered2011_df, result_df, ranking_parts, record_parts, metric),
+              rows_in=len(filtered2011_df))
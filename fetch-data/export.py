@@ -0,0 +1,123 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+from loader import CONFLICT_KEYS
+
+
+# Rows converted to Python values at a time
+CHUNK_SIZE = 100000
+
+# Same definitions as the materialized views of sql/schema.sql
+LATEST_VIEWS = {
+    'latest_player_metrics': """
+        select m.event, p.id, p.name, p.country,
+            m.best_365, m.average_365, m.best_90, m.average_90,
+            m.rank90best, m.rank90avg, m.rank365best, m.rank365avg,
+            m.rank90best_national, m.rank90avg_national, m.rank365best_national, m.rank365avg_national
+        from (
+            select *, row_number() over (partition by event, "personId" order by date desc) as recency
+            from player_metrics
+        ) m
+        join persons p on p.id = m."personId"
+        where m.recency = 1
+    """,
+    'latest_competition_ranking': """
+        select r.event, r.competition_id, r.comp_id, c.name, c.city, c.country, c.date_from,
+            r.rank90avg_avg, r.rank365avg_avg, r.perf90avg, r.perf365avg
+        from competition_ranking r
+        join competitions c on c.id = r.competition_id
+    """,
+}
+
+# Lookups and orderings used by the dashboard (see data_source.LocalSource);
+# 'is null' first mirrors Postgres' nulls-last leaderboard order
+INDEXES = [
+    'create index competitions_comp_id_idx on competitions (comp_id)',
+    'create index competition_ranking_comp_id_idx on competition_ranking (event, comp_id)',
+    'create unique index latest_player_metrics_id_idx on latest_player_metrics (event, id)',
+    'create index latest_player_metrics_rank_idx on latest_player_metrics (event, rank365avg is null, rank365avg, id)',
+    # Events ranked by single (pipeline.RANKED_BY_SINGLE)
+    'create index latest_player_metrics_rank_best_idx on latest_player_metrics '
+    '(event, rank365best is null, rank365best, id)',
+    'create unique index latest_competition_ranking_id_idx on latest_competition_ranking (event, competition_id)',
+    'create index latest_competition_ranking_rank_idx on latest_competition_ranking '
+    '(event, rank365avg_avg is null, rank365avg_avg, competition_id)',
+]
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _sql_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return 'integer'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'real'
+    return 'text'
+
+
+def _for_sqlite(df):
+    """
+    Dates as 'YYYY-MM-DD' text, like the PostgREST output the dashboard also reads.
+    """
+    df = df.copy()
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column].dt.strftime('%Y-%m-%d')
+    return df
+
+
+def _write_table(conn, table, frames):
+    """
+    Create `table` from a DataFrame, or from an iterable of DataFrames with the
+    same columns and distinct keys (a table too large for memory, see loader.EventParts).
+    """
+    keys = CONFLICT_KEYS[table].split(',')
+    for i, df in enumerate([frames] if isinstance(frames, pd.DataFrame) else frames):
+        df = _for_sqlite(df.drop_duplicates(subset=keys, keep='last'))
+        if i == 0:
+            columns = ', '.join(f'{_quote(c)} {_sql_type(df[c].dtype)}' for c in df.columns)
+            key_columns = ', '.join(_quote(c) for c in keys)
+            conn.execute(f'create table {_quote(table)} ({columns}, primary key ({key_columns})) without rowid')
+            placeholders = ', '.join('?' for _ in df.columns)
+        # Converted chunk by chunk: object copies of the whole player_metrics would not fit in memory
+        for start in range(0, len(df), CHUNK_SIZE):
+            chunk = df.iloc[start:start + CHUNK_SIZE].astype(object)
+            rows = chunk.where(chunk.notna(), None).itertuples(index=False, name=None)
+            conn.executemany(f'insert into {_quote(table)} values ({placeholders})', rows)
+
+
+def export_sqlite(tables, path):
+    """
+    Write the dashboard tables (see loader.build_tables) and their latest_* views
+    to a SQLite file, indexed for the dashboard's lookups. The file is built next
+    to `path` and swapped in at the end, so a running dashboard never reads a
+    half-written database.
+    Returns:
+    - path
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute('pragma journal_mode = off')
+        conn.execute('pragma synchronous = off')
+        with conn:
+            for table, df in tables.items():
+                _write_table(conn, table, df)
+            for view, query in LATEST_VIEWS.items():
+                conn.execute(f'create table {view} as {query}')
+            for statement in INDEXES:
+                conn.execute(statement)
+        conn.execute('analyze')
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,129 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+from urllib3.util.retry import Retry
+
+from http_cache import CachedResponse
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HostRateLimiter:
+    """
+    Space out requests so that each host sees at most `rate` requests per second,
+    shared across all worker threads. A rate of None or 0 disables the limit.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = {}
+
+    def wait(self, host):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Fetcher:
+    """
+    Pooled HTTP client for the wca-rest-api downloads.
+
+    - One keep-alive connection pool sized to `max_workers`
+    - Retries with exponential backoff on 429/5xx (honours Retry-After)
+    - Per-host rate limiting across threads
+    - `map` runs a function over many items with bounded concurrency
+    - Optional on-disk ResponseCache: conditional requests for cached URLs,
+      no request at all for immutable ones, and an offline mode that only
+      serves from the cache
+    """
+
+    def __init__(self, max_workers=16, rate_per_host=50, retries=5, backoff_factor=0.5, timeout=(5, 60),
+                 cache=None, offline=False):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache = cache
+        self.offline = offline
+        self.limiter = HostRateLimiter(rate_per_host)
+        self.stats = {'requests': 0, 'bytes': 0, 'not_modified': 0, 'cache_hits': 0}
+        self._stats_lock = threading.Lock()
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, immutable=False, **kwargs):
+        """
+        GET `url`, going through the response cache when one is configured.
+        `immutable=True` means the resource will not change anymore: once it is
+        cached it is served from disk without revalidation.
+        """
+        if self.cache is None:
+            return self._request(url, **kwargs)
+
+        meta, body = self.cache.load(url)
+        if meta is not None and (meta.get('immutable') or self.offline):
+            self._count(cache_hits=1)
+            return CachedResponse(url, 200, body)
+        if self.offline:
+            return CachedResponse(url, 504)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if meta is not None:
+            headers.update(self.cache.conditional_headers(meta))
+        response = self._request(url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and meta is not None:
+            self._count(not_modified=1)
+            if immutable and not meta.get('immutable'):
+                meta['immutable'] = True
+                self.cache.update_meta(url, meta)
+            return CachedResponse(url, 200, body, response.headers)
+        if response.status_code == 200:
+            self.cache.store(url, response, immutable=immutable)
+        return response
+
+    def _request(self, url, **kwargs):
+        self.limiter.wait(urlsplit(url).netloc)
+        kwargs.setdefault('timeout', self.timeout)
+        response = self.session.get(url, **kwargs)
+        self._count(requests=1, bytes=len(response.content))
+        return response
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def map(self, func, items, desc=None):
+        """
+        Apply `func` to every item using the worker pool.
+        Returns:
+        - list of results in the same order as `items`
+        """
+        items = list(items)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(tqdm(executor.map(func, items), total=len(items), desc=desc))
+
+    def close(self):
+        self.session.close()
@@ -1,109 +1,171 @@
-import requests
+import argparse
+import multiprocessing
+import os
 import pandas as pd
-import time
-from datetime import datetime, timedelta
-from tqdm import tqdm
+from concurrent.futures import ProcessPoolExecutor
+
+from checkpoint import STAGES, StageStore
+from events import event_store, run_event
+from export import export_sqlite
+from fetcher import Fetcher
+from http_cache import ResponseCache
+from loader import PostgrestLoader, build_tables
+from parsing import parse_person_page
+from profiling import profiler
+from pipeline import EVENTS, TOP_PERSONS, clean_results, filter_by_event
+from shards import DEFAULT_MEMORY_BUDGET_MB
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser(description="Rebuild the historical WCA rankings from wca-rest-api")
+parser.add_argument('--events', nargs='+', choices=EVENTS, default=EVENTS,
+                    help="WCA events to rank (all of them by default)")
+parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                    help="processes computing the per-event stages in parallel")
+parser.add_argument('--all-persons', action='store_true',
+                    help=f"rank every person instead of the top {TOP_PERSONS:,}, in shards that fit --memory-budget")
+parser.add_argument('--memory-budget', type=int, default=DEFAULT_MEMORY_BUDGET_MB, metavar='MB',
+                    help="memory for the records / rankings of one worker with --all-persons")
+parser.add_argument('--incremental', action='store_true',
+                    help="only recompute what changed since the run saved in --state-dir")
+parser.add_argument('--state-dir', default=os.path.join(SCRIPT_DIR, 'state'),
+                    help="where the previous run's record/ranking/competition frames are kept, per event")
+parser.add_argument('--checkpoint-dir', default=os.path.join(SCRIPT_DIR, 'checkpoints'),
+                    help="where every stage output is written as Parquet")
+stage_args = parser.add_mutually_exclusive_group()
+stage_args.add_argument('--resume-from', choices=STAGES,
+                        help="load the stages before this one from their checkpoints and run the rest")
+stage_args.add_argument('--rerun', choices=STAGES, nargs='+',
+                        help="recompute only these stages, loading every other stage from its checkpoint")
+parser.add_argument('--profile-dir', default=os.path.join(SCRIPT_DIR, 'profiles'),
+                    help="where the per-stage profiling report of each run is written")
+parser.add_argument('--load', action='store_true',
+                    help="upsert the result tables into PostgREST (POSTGREST_URL / SUPABASE_KEY)")
+parser.add_argument('--export', metavar='SQLITE_PATH',
+                    help="write the dashboard tables to a SQLite file the app can serve from (WCA_LOCAL_DB)")
+args = parser.parse_args()
+if args.all_persons and args.incremental:
+    parser.error("--incremental only tracks the top persons, it cannot be combined with --all-persons")
+
+# Parallelism / politeness of the wca-rest-api downloads
+MAX_WORKERS = 16
+RATE_PER_HOST = 50  # requests per second
+
+# On-disk response cache (ETag / Last-Modified revalidation)
+CACHE_DIR = os.environ.get('WCA_CACHE_DIR', os.path.join(SCRIPT_DIR, '.cache'))
+# Set WCA_OFFLINE=1 to serve everything from a warm cache without network access
+OFFLINE = os.environ.get('WCA_OFFLINE') == '1'
+# Results of a competition are considered final this many days after it ended
+RESULTS_FINAL_AFTER_DAYS = 30
+
+# PostgREST endpoint for --load; point it at a local PostgREST to test a load
+POSTGREST_URL = os.environ.get('POSTGREST_URL', 'https://bvkfmjbkamxntyclcymu.supabase.co/rest/v1')
+SUPABASE_KEY = os.environ.get('SUPABASE_KEY')
+
+fetcher = Fetcher(
+    max_workers=MAX_WORKERS,
+    rate_per_host=RATE_PER_HOST,
+    cache=ResponseCache(CACHE_DIR),
+    offline=OFFLINE,
+)
+
+store = StageStore(args.checkpoint_dir, resume_from=args.resume_from, rerun=args.rerun)
 
+profiler.add_counters('wca_rest_api', lambda: fetcher.stats)
 
-#### HELPERS
 
-def filter_by_event(df, event_code):
+def run_stage(stage, func, rows_in=None, stage_store=store, name=None):
     """
-    Filter a DataFrame of competitions for those that include a specific event.
-    Returns:
-    - pd.DataFrame filtered to rows where event_code is present in 'events'
+    Run (or reload) a checkpointed stage under the profiler.
     """
-    return df[df['events'].apply(lambda x: event_code in x if isinstance(x, list) else False)]
+    with profiler.stage(name or stage, rows_in=rows_in) as entry:
+        df = stage_store.run(stage, func)
+        entry['rows_out'] = len(df)
+    return df
 
 ############
 ### 1 - Competitions
 ############
 
-all_dfs = []
+def load_competitions():
+    all_dfs = []
+
+    # 1. Load competitions from 2015 to 2025
+    for year in range(2010, 2026):
+        url = f'https://raw.githubusercontent.com/robiningelbrecht/wca-rest-api/master/api/competitions/{year}.json'
+        response = fetcher.get(url)
+
+        if response.status_code == 200:
+            data = response.json()
+            items = data.get('items', [])
+            if items:
+                df = pd.json_normalize(items, sep='_')
+                df['comp_id'] = df['id'].str.replace(rf'{year}$', '', regex=True)
+                df['isChampionship'] = False  # Mark as regular competition
+                all_dfs.append(df)
+            else:
+                print(f"No competitions found for {year}")
+        else:
+            print(f"Failed to load competitions for {year}: HTTP {response.status_code}")
+
+    # 2. Load the championships
+    championship_url = 'https://raw.githubusercontent.com/robiningelbrecht/wca-rest-api/master/api/championships-page-1.json'
+    response = fetcher.get(championship_url)
 
-# 1. Load competitions from 2015 to 2025
-for year in range(2010, 2026):
-    url = f'https://raw.githubusercontent.com/robiningelbrecht/wca-rest-api/master/api/competitions/{year}.json'
-    response = requests.get(url)
-    
     if response.status_code == 200:
         data = response.json()
         items = data.get('items', [])
         if items:
-            df = pd.json_normalize(items, sep='_')
-            df['comp_id'] = df['id'].str.replace(rf'{year}$', '', regex=True)
-            df['isChampionship'] = False  # Mark as regular competition
-            all_dfs.append(df)
-        else:
-            print(f"No competitions found for {year}")
+            champ_df = pd.json_normalize(items, sep='_')
+            champ_df['comp_id'] = champ_df['id'].str.replace(r'\d{4}$', '', regex=True)
+            champ_df['isChampionship'] = True  # Mark as championship
+            all_dfs.append(champ_df)
     else:
-        print(f"Failed to load competitions for {year}: HTTP {response.status_code}")
-
-# 2. Load the championships
-championship_url = 'https://raw.githubusercontent.com/robiningelbrecht/wca-rest-api/master/api/championships-page-1.json'
-response = requests.get(championship_url)
-
-if response.status_code == 200:
-    data = response.json()
-    items = data.get('items', [])
-    if items:
-        champ_df = pd.json_normalize(items, sep='_')
-        champ_df['comp_id'] = champ_df['id'].str.replace(r'\d{4}$', '', regex=True)
-        champ_df['isChampionship'] = True  # Mark as championship
-        all_dfs.append(champ_df)
-else:
-    print(f"Failed to load championships: HTTP {response.status_code}")
-
-# 3. Combine all into one DataFrame
-full_df = pd.concat(all_dfs, ignore_index=True)
-# Ensure 'date_from' is a datetime type
-full_df['date_from'] = pd.to_datetime(full_df['date_from'], errors='coerce')
-# Filter rows with date_from >= 2020-01-01
-filtered_df = full_df[full_df['date_from'] >= pd.Timestamp('2010-01-01')]
-filtered_df = filter_by_event(filtered_df, '333')
-filtered_df = filtered_df[filtered_df['isCanceled']==False]
-filtered_df=filtered_df[['id','name','city','country','isCanceled','events','externalWebsite','date_from','date_till','venue_coordinates_latitude','venue_coordinates_longitude','comp_id','isChampionship']]
+        print(f"Failed to load championships: HTTP {response.status_code}")
 
+    # 3. Combine all into one DataFrame
+    full_df = pd.concat(all_dfs, ignore_index=True)
+    # Ensure 'date_from' is a datetime type
+    full_df['date_from'] = pd.to_datetime(full_df['date_from'], errors='coerce')
+    # Filter rows with date_from >= 2020-01-01
+    filtered_df = full_df[full_df['date_from'] >= pd.Timestamp('2010-01-01')]
+    # Not filtered by --events, so a later --resume-from may rank other events: each event stage filters its own
+    filtered_df = filtered_df[filtered_df['isCanceled']==False]
+    filtered_df=filtered_df[['id','name','city','country','isCanceled','events','externalWebsite','date_from','date_till','venue_coordinates_latitude','venue_coordinates_longitude','comp_id','isChampionship']]
 
-filtered_df = filtered_df.drop_duplicates(subset='id', keep='first')
+    return filtered_df.drop_duplicates(subset='id', keep='first')
 
+filtered_df = run_stage('competitions', load_competitions)
 
 
 ############
 ### 2 - Person
 ############
 
-total_pages = 266
-
+def person_page_url(page):
+    if page == 1:
+        return 'https://raw.githubusercontent.com/robiningelbrecht/wca-rest-api/master/api/persons.json'
+    return f'https://raw.githubusercontent.com/robiningelbrecht/wca-rest-api/master/api/persons-page-{page}.json'
 
-# Initialize list to hold all page DataFrames
-all_person_dfs = []
-j = 0 
 
-# Loop through each page and collect items
-for page in range(1, total_pages + 1):
-    j=j+1
-    print(j)
-    if page == 1:
-        url = 'https://raw.githubusercontent.com/robiningelbrecht/wca-rest-api/master/api/persons.json'
-    else:
-        url = f'https://raw.githubusercontent.com/robiningelbrecht/wca-rest-api/master/api/persons-page-{page}.json'
-    
-    response = requests.get(url)
+def fetch_person_page(page):
+    response = fetcher.get(person_page_url(page))
     if response.status_code == 200:
-        data = response.json()
-        items = data.get('items', [])
-        df = pd.json_normalize(items, sep='_')
-        
-        # Drop undesired columns if they exist
-        df = df.drop(columns=[col for col in df.columns if any(exclude in col for exclude in ['rank', 'medals', 'records', 'results'])], errors='ignore')
-        
-        all_person_dfs.append(df)
+        # Only the scalar person fields are extracted, nested stats are skipped while parsing
+        return parse_person_page(response.content)
+    print(f"Failed to fetch persons page {page}: HTTP {response.status_code}")
+    return []
+
+
+def load_persons():
+    total_pages = 266
+
+    # Fetch all pages concurrently, keeping page order
+    pages = fetcher.map(fetch_person_page, range(1, total_pages + 1), desc="Fetching persons")
 
-# Concatenate all DataFrames
-persons_df = pd.concat(all_person_dfs, ignore_index=True)
+    return pd.DataFrame.from_records([person for page in pages for person in page])
 
-persons_df = persons_df.drop(columns=['competitionIds','championshipIds'])
+persons_df = run_stage('persons', load_persons)
 
 
 ############
@@ -111,15 +173,11 @@ persons_df = persons_df.drop(columns=['competitionIds','championshipIds'])
 ############
 
 
-result_dfs = []
-i=0
-# Loop over each competition in filtered_df
-for comp_id in filtered_df['id']:
-    url_result = f'https://raw.githubusercontent.com/robiningelbrecht/wca-rest-api/master/api/results/{comp_id}/333.json'
-    response = requests.get(url_result)
-    time.sleep(0.01)
-    print(i)
-    i=i+1
+def fetch_results(comp):
+    comp_id, event, is_final = comp
+    url_result = f'https://raw.githubusercontent.com/robiningelbrecht/wca-rest-api/master/api/results/{comp_id}/{event}.json'
+    # Results of long-finished competitions never change: serve them from disk
+    response = fetcher.get(url_result, immutable=is_final)
 
     if response.status_code == 200:
         data = response.json()
@@ -129,240 +187,87 @@ for comp_id in filtered_df['id']:
             df = pd.json_normalize(items, sep='_')
 
             # Select and rename desired columns
-            df_filtered = df[['competitionId', 'personId', 'round', 'position', 'best', 'average', 'solves']].copy()
-
-            # Append to result list
-            result_dfs.append(df_filtered)
+            return df[['competitionId', 'personId', 'round', 'position', 'best', 'average', 'solves']].copy()
         else:
-            print(f"No results found for {comp_id}")
+            print(f"No {event} results found for {comp_id}")
     else:
-        print(f"Failed to fetch results for {comp_id}: HTTP {response.status_code}")
-
-# Combine all result dataframes
-result_df = pd.concat(result_dfs, ignore_index=True)
-
-result_df[['best', 'average']] = result_df[['best', 'average']].replace([-1, 0], 99999)
-result_df = result_df.drop(columns=['solves','position'])
-
-round_mapping = {
-    'Final': 1,
-    'Second round': 2,
-    'First round': 3,
-    'Semi Final': 4,
-    'Qualification round': 5
-}
-
-result_df['round'] = result_df['round'].map(round_mapping).astype(int)
-
-
-result_df = result_df.drop_duplicates(subset=['competitionId', 'personId', 'round'], keep='first')
-
-
-############
-### 3 - Best performance of last 90d and 365d
-############
-
-
-# Step 1: Merge competitions and results
-
-df = result_df.merge(filtered_df[['id', 'date_from']], left_on='competitionId', right_on='id')
-df = df.drop(columns='id')
-df['date_from'] = pd.to_datetime(df['date_from'])
-
-# Step 2: Filter top 20,000 persons by overall best average (simulated here with fewer)
-top_persons = (
-    result_df.groupby('personId')['average']
-    .mean()
-    .nsmallest(20000)  # Keep this as-is, even if fewer people in example
-    .index
-)
-df = df[df['personId'].isin(top_persons)]
-
-# Step 3: Compute rolling performance
-df = df.sort_values(['personId', 'date_from'])
-df = df.set_index('date_from')
-
-rolled_365 = df.groupby('personId').rolling('365D', closed='both')[['best', 'average']].min()
-rolled_365.columns = ['best_365', 'average_365']
-
-rolled_90 = df.groupby('personId').rolling('90D', closed='both')[['best', 'average']].min()
-rolled_90.columns = ['best_90', 'average_90']
-rolled = pd.concat([rolled_365, rolled_90], axis=1).reset_index()
+        print(f"Failed to fetch {event} results for {comp_id}: HTTP {response.status_code}")
+    return None
 
-# Step 4: Reduce to weekly level only
-rolled['date_from'] = pd.to_datetime(rolled['date_from'])
-rolled['week'] = rolled['date'] - pd.to_timedelta(rolled['date'].dt.weekday, unit='D')
-rolled = rolled.groupby(['personId', 'week'])[['best_365', 'average_365', 'best_90', 'average_90']].min().reset_index()
 
-# Step 5: Expand between first and last date per person on weekly basis
-min_max = rolled.groupby('personId')['week'].agg(['min', 'max']).reset_index()
+def load_results(event):
+    event_df = filter_by_event(filtered_df, event)
+    final_cutoff = pd.Timestamp.today().normalize() - pd.Timedelta(days=RESULTS_FINAL_AFTER_DAYS)
+    is_final = pd.to_datetime(event_df['date_till'], errors='coerce') < final_cutoff
 
-weekly_grid = []
-for _, row in min_max.iterrows():
-    weeks = pd.date_range(start=row['min'], end=row['max'], freq='W-MON')
-    weekly_grid.append(pd.DataFrame({'date': weeks, 'personId': row['personId']}))
+    # Fetch every competition concurrently, keeping event_df order
+    result_dfs = fetcher.map(fetch_results, zip(event_df['id'], [event] * len(event_df), is_final),
+                             desc=f"Fetching {event} results")
+    result_dfs = [df for df in result_dfs if df is not None]
+    if not result_dfs:
+        result_dfs = [pd.DataFrame(columns=['competitionId', 'personId', 'round', 'position', 'best', 'average', 'solves'])]
 
-weekly_df = pd.concat(weekly_grid, ignore_index=True)
+    # Combine all result dataframes
+    result_df = pd.concat(result_dfs, ignore_index=True)
 
-# Step 6: Merge and forward fill
-rolled = rolled.rename(columns={'week': 'date'})
-record_df = weekly_df.merge(rolled, on=['date', 'personId'], how='left')
-record_df = record_df.sort_values(['personId', 'date'])
+    return clean_results(result_df)
 
-record_df[['best_365', 'average_365', 'best_90', 'average_90']] = (
-    record_df.groupby('personId')[['best_365', 'average_365', 'best_90', 'average_90']].ffill()
-)
-
-record_df = record_df.drop_duplicates(subset=['date', 'personId'], keep='first')
+# Downloads share the fetcher's connections and rate limit, so events are fetched one after the other.
+# The frames are not kept: the workers read them back from the checkpoints.
+for event in args.events:
+    run_stage('results', lambda: load_results(event),
+              stage_store=event_store(args.checkpoint_dir, event, args.resume_from, args.rerun), name=f'{event}/results')
 
 
 ############
-### 4 - Player World Ranking
+### 4 - Records, rankings and competition ranking, per event
 ############
 
-def compute_weekly_ranks(df):
-    df['rank90best'] = df['best_90'].rank(method='min')
-    df['rank90avg'] = df['average_90'].rank(method='min')
-    df['rank365best'] = df['best_365'].rank(method='min')
-    df['rank365avg'] = df['average_365'].rank(method='min')
-    return df
+# Every event is independent: one worker process per event, each reading its
+# inputs from the checkpoints and checkpointing its outputs (see events.run_event).
+# fork, since a spawned worker would re-run this script when importing it.
+with ProcessPoolExecutor(max_workers=min(args.workers, len(args.events)), mp_context=multiprocessing.get_context('fork')) as pool:
+    event_runs = {
+        event: pool.submit(run_event, event, args.checkpoint_dir, args.state_dir, args.resume_from, args.rerun,
+                           args.incremental, args.all_persons, args.memory_budget)
+        for event in args.events
+    }
+    for event, future in event_runs.items():
+        profiler.add_stages(future.result(), event)
 
-ranking_df = record_df.groupby('date').apply(compute_weekly_ranks).reset_index(drop=True)
-ranking_df = ranking_df[['date', 'personId', 'rank90best', 'rank90avg', 'rank365best', 'rank365avg']]
-ranking_df = ranking_df.drop_duplicates(subset=['date', 'personId'], keep='first')
 
 ##########
-## 6 - Player National ranking
+## 8 - Insert tables in Supabase
 ##########
 
-ranking_with_country = ranking_df.merge(persons_df[['id', 'country']], left_on='personId', right_on='id', how='left').drop(columns=['id'])
+if args.load or args.export:
+    rankings, comp_rankings = {}, {}
+    for event in args.events:
+        event_checkpoints = event_store(args.checkpoint_dir, event)
+        # Read part by part while loading / exporting, the whole table may not fit in memory
+        rankings[event] = event_checkpoints.parts('ranking')
+        comp_rankings[event] = event_checkpoints.load('comp_ranking')
+    tables = build_tables(filter_by_event(filtered_df, *args.events), persons_df, rankings, comp_rankings)
 
-# For each date and country, compute national rankings of the participants
-national_ranking_df = ranking_with_country.groupby(['date', 'country', 'personId'], as_index=False).agg({
-    'rank90best': 'min',
-    'rank90avg': 'min',
-    'rank365best': 'min',
-    'rank365avg': 'min'
-})
+if args.load:
+    loader = PostgrestLoader(POSTGREST_URL, api_key=SUPABASE_KEY)
+    profiler.add_counters('postgrest', lambda: loader.stats)
+    with profiler.stage('load', rows_in=sum(len(df) for df in tables.values())):
+        loader.load_all(tables)
 
 
 ##########
-## 7 - Merge world, national rankings and performance by player
+## 9 - Export for a local dashboard
 ##########
 
-combined_df = pd.merge(ranking_df, record_df, on=['date', 'personId'], how='outer')
-combined_df = pd.merge(combined_df, national_ranking_df, on=['date', 'personId'], how='outer', suffixes=('', '_national'))
-
-#combined_df = combined_df.drop(columns=["country"])
-
-combined2024_df = combined_df[pd.to_datetime(combined_df['date']) >= pd.Timestamp('2024-01-01')]
-
-############
-### 8 - Competition ranking
-############
-
-
-
-filtered2011_df = filtered_df[pd.to_datetime(filtered_df['date_from']) >= pd.Timestamp('2011-01-01')]
-
-
-comp_rank_stats_loop = []
-j = 0 
-
-for _, row in filtered2011_df.iterrows():
-    print(j)
-    j=j+1
-    comp_id = row['id']
-    comp_date = row['date_from']
-
-    participants = result_df[result_df['competitionId'] == comp_id]['personId'].unique()
-
-    # Ranking data
-    # Filter ranking entries for participants
-    relevant_ranks = ranking_df[ranking_df['personId'].isin(participants)]
-    after_rank = relevant_ranks[relevant_ranks['date'] >= comp_date]
-    valid_ranks = after_rank.sort_values('date').groupby('personId').first().reset_index()
-
-    # Record data
-    relevant_perf = record_df[record_df['personId'].isin(participants)]
-    after_perf = relevant_perf[relevant_perf['date'] >= comp_date]
-    valid_perf = after_perf.sort_values('date').groupby('personId').first().reset_index()
-
-    stats = {'competition_id': comp_id}
-
-    if not valid_ranks.empty:
-        top10_ranks = valid_ranks.nsmallest(10, 'rank90best')
-        stats.update({
-            'rank90avg_avg': top10_ranks['rank90avg'].mean(),
-            'rank365avg_avg': top10_ranks['rank365avg'].mean(),
-        })
-
-    if not valid_perf.empty:
-        top10_perf = valid_perf.nsmallest(10, 'average_90')
-        stats.update({
-            'perf90avg': top10_perf['average_90'].mean(),
-            'perf365avg': top10_perf['average_365'].mean(),
-        })
-
-    comp_rank_stats_loop.append(stats)
-
-# Creating DataFrame from results
-comp_ranking_df = pd.DataFrame(comp_rank_stats_loop)
-
-comp_ranking_df = comp_ranking_df.drop_duplicates(subset='competition_id', keep='first')
-
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
-
-# Store results
-comp_rank_stats_loop = []
-
-# Define the function to process one row
-def process_competition(row):
-    comp_id = row['id']
-    comp_date = row['date_from']
-
-    participants = result_df[result_df['competitionId'] == comp_id]['personId'].unique()
-
-    # Ranking data
-    relevant_ranks = ranking_df[ranking_df['personId'].isin(participants)]
-    after_rank = relevant_ranks[relevant_ranks['date'] >= comp_date]
-    valid_ranks = after_rank.sort_values('date').groupby('personId').first().reset_index()
-
-    # Performance data
-    relevant_perf = record_df[record_df['personId'].isin(participants)]
-    after_perf = relevant_perf[relevant_perf['date'] >= comp_date]
-    valid_perf = after_perf.sort_values('date').groupby('personId').first().reset_index()
-
-    stats = {'competition_id': comp_id}
-
-    if not valid_ranks.empty:
-        top10_ranks = valid_ranks.nsmallest(10, 'rank90best')
-        stats.update({
-            'rank90avg_avg': top10_ranks['rank90avg'].mean(),
-            'rank365avg_avg': top10_ranks['rank365avg'].mean(),
-        })
-
-    if not valid_perf.empty:
-        top10_perf = valid_perf.nsmallest(10, 'average_90')
-        stats.update({
-            'perf90avg': top10_perf['average_90'].mean(),
-            'perf365avg': top10_perf['average_365'].mean(),
-        })
-
-    return stats
-
-# Use ThreadPoolExecutor with tqdm for progress tracking
-with ThreadPoolExecutor(max_workers=10) as executor:
-    futures = [executor.submit(process_competition, row) for _, row in filtered2011_df.iterrows()]
-    for future in tqdm(as_completed(futures), total=len(futures), desc="Processing competitions"):
-        comp_rank_stats_loop.append(future.result())
-
-comp_ranking_df = pd.DataFrame(comp_rank_stats_loop)
-comp_ranking_df = comp_ranking_df.drop_duplicates(subset='competition_id', keep='first')
+if args.export:
+    with profiler.stage('export', rows_in=sum(len(df) for df in tables.values())):
+        print(f"Dashboard tables written to {export_sqlite(tables, args.export)}")
 
 
 ##########
-## 8 - Insert tables in Supabase
+## Profiling report
 ##########
 
+print(profiler.summary())
+print(f"Profile written to {profiler.write(args.profile_dir)}")
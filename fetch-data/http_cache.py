@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+
+class CachedResponse:
+    """
+    Minimal stand-in for requests.Response when the body comes from disk.
+    """
+
+    def __init__(self, url, status_code, content=b'', headers=None, from_cache=True):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class ResponseCache:
+    """
+    On-disk HTTP response cache keyed by URL.
+
+    Each entry is a body file plus a small JSON sidecar with the validators
+    (ETag / Last-Modified) needed to revalidate it with a conditional request.
+    Entries marked immutable are served without contacting the server.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        folder = os.path.join(self.directory, key[:2])
+        return os.path.join(folder, key + '.body'), os.path.join(folder, key + '.json')
+
+    def load(self, url):
+        """
+        Returns:
+        - (meta dict, body bytes), or (None, None) when the URL is not cached
+        """
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        return meta, body
+
+    def store(self, url, response, immutable=False):
+        body_path, meta_path = self._paths(url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_type': response.headers.get('Content-Type'),
+            'immutable': immutable,
+            'fetched_at': time.time(),
+        }
+        # Body first, then metadata: a meta file always points at a complete body
+        _atomic_write(body_path, response.content)
+        _atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+
+    def update_meta(self, url, meta):
+        _atomic_write(self._paths(url)[1], json.dumps(meta).encode('utf-8'))
+
+    def conditional_headers(self, meta):
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+
+def _atomic_write(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,156 @@
+import os
+
+import pandas as pd
+
+from checkpoint import frame_exists, load_frame, save_frame
+from pipeline import (
+    RECORD_COLUMNS,
+    compute_competition_ranking,
+    compute_rankings,
+    compute_records,
+    select_top_persons,
+)
+
+
+STATE_FRAMES = ['result_df', 'filtered_df', 'record_df', 'ranking_df', 'comp_ranking_df']
+
+RESULT_KEY = ['competitionId', 'personId', 'round', 'best', 'average', 'date_from']
+
+
+############
+### State persistence
+############
+
+def load_state(state_dir):
+    """
+    Returns:
+    - dict of the frames saved by the previous run, or None if there is no complete state
+    """
+    paths = {name: os.path.join(state_dir, name) for name in STATE_FRAMES}
+    if not all(frame_exists(path) for path in paths.values()):
+        return None
+    return {name: load_frame(path) for name, path in paths.items()}
+
+
+def save_state(state_dir, **frames):
+    os.makedirs(state_dir, exist_ok=True)
+    for name in STATE_FRAMES:
+        save_frame(os.path.join(state_dir, name), frames[name])
+
+
+############
+### Change detection
+############
+
+def _dated_results(result_df, filtered_df):
+    df = result_df.merge(filtered_df[['id', 'date_from']], left_on='competitionId', right_on='id', how='left')
+    return df[RESULT_KEY]
+
+
+def changed_results(old_result_df, old_filtered_df, result_df, filtered_df):
+    """
+    Result rows that were added, removed or modified (including a moved competition date)
+    since the previous run.
+    Returns:
+    - pd.DataFrame with RESULT_KEY columns
+    """
+    old = _dated_results(old_result_df, old_filtered_df)
+    new = _dated_results(result_df, filtered_df)
+    diff = old.merge(new, on=RESULT_KEY, how='outer', indicator=True)
+    return diff[diff['_merge'] != 'both'][RESULT_KEY]
+
+
+def first_changed_date(old_df, new_df, key, columns):
+    """
+    Earliest date at which two record/ranking frames disagree (missing rows count as a change).
+    Returns:
+    - pd.Timestamp, or None if both frames hold the same rows
+    """
+    merged = old_df.merge(new_df, on=key, how='outer', suffixes=('_old', '_new'), indicator=True)
+    changed = merged['_merge'] != 'both'
+    for col in columns:
+        old_values, new_values = merged[f'{col}_old'], merged[f'{col}_new']
+        changed |= (old_values != new_values) & ~(old_values.isna() & new_values.isna())
+    if not changed.any():
+        return None
+    return merged.loc[changed, 'date'].min()
+
+
+############
+### Incremental run
+############
+
+def run_incremental(state, result_df, filtered_df, comps_df, persons_df, metric='average'):
+    """
+    Update the previous run's record_df / ranking_df / comp_ranking_df for new or
+    changed results, recomputing only what they can affect:
+    - records of persons with changed results or who entered / left the top persons
+    - world and national ranks of every week from the first week where a record
+      (or a ranked person's country) changed
+    - competition ranks of competitions with an affected participant, a changed
+      result, or a ranking week that was recomputed
+    The output is identical to a full run on the same inputs, with top persons and
+    competition ranks on the `metric` results.
+    Returns:
+    - (record_df, ranking_df, comp_ranking_df)
+    """
+    old_records = state['record_df']
+    old_ranking = state['ranking_df']
+    old_comp_ranking = state['comp_ranking_df']
+
+    # Persons whose records may differ from the previous run
+    changed = changed_results(state['result_df'], state['filtered_df'], result_df, filtered_df)
+    top_persons = select_top_persons(result_df, metric=metric)
+    old_top_persons = select_top_persons(state['result_df'], metric=metric)
+    affected = set(changed['personId']) | set(top_persons.symmetric_difference(old_top_persons))
+    affected &= set(top_persons) | set(old_top_persons)
+
+    # Records: recompute affected persons only
+    is_affected = old_records['personId'].isin(affected)
+    new_affected_records = compute_records(result_df, filtered_df, top_persons.intersection(affected))
+    start_date = first_changed_date(
+        old_records[is_affected], new_affected_records, ['date', 'personId'], RECORD_COLUMNS
+    )
+    record_df = pd.concat([old_records[~is_affected], new_affected_records], ignore_index=True)
+    record_df = record_df.sort_values(['personId', 'date']).reset_index(drop=True)
+
+    # A person changing country moves national ranks over their whole history
+    countries = persons_df.drop_duplicates(subset='id', keep='first').set_index('id')['country']
+    new_country = old_ranking['personId'].map(countries)
+    moved = (old_ranking['country'] != new_country) & ~(old_ranking['country'].isna() & new_country.isna())
+    if moved.any():
+        moved_date = old_ranking.loc[moved, 'date'].min()
+        start_date = moved_date if start_date is None else min(start_date, moved_date)
+
+    # Ranks: weeks before the first change are untouched
+    if start_date is None:
+        ranking_df = old_ranking
+    else:
+        ranking_df = pd.concat([
+            old_ranking[old_ranking['date'] < start_date],
+            compute_rankings(record_df[record_df['date'] >= start_date], persons_df),
+        ], ignore_index=True)
+
+    # Competition ranks: a competition looks up the first weekly row on or after its date,
+    # which lies less than a week after the competition
+    changed_comps = set(changed['competitionId'])
+    comps_with_affected = set(result_df.loc[result_df['personId'].isin(affected), 'competitionId'])
+    stale = comps_df['id'].isin(changed_comps | comps_with_affected)
+    if start_date is not None:
+        stale |= comps_df['date_from'] > start_date - pd.Timedelta(days=7)
+    stale |= ~comps_df['id'].isin(old_comp_ranking['competition_id'])
+
+    recomputed = compute_competition_ranking(comps_df[stale], result_df, ranking_df, record_df, metric)
+    kept = old_comp_ranking[old_comp_ranking['competition_id'].isin(comps_df.loc[~stale, 'id'])]
+    comp_ranking_df = pd.concat([kept, recomputed], ignore_index=True)
+
+    # Restore the competition order of a full run
+    order = pd.Series(range(len(comps_df)), index=comps_df['id'].values)
+    order = order[~order.index.duplicated(keep='first')]
+    comp_ranking_df = comp_ranking_df.iloc[comp_ranking_df['competition_id'].map(order).argsort(kind='stable')]
+    comp_ranking_df = comp_ranking_df.reset_index(drop=True)
+
+    print(f"Incremental run: {len(changed_comps)} changed competitions, {len(affected)} affected persons, "
+          f"ranks recomputed from {start_date.date() if start_date is not None else 'nowhere'}, "
+          f"{int(stale.sum())} competitions re-ranked")
+    return record_df, ranking_df, comp_ranking_df
@@ -0,0 +1,177 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+from urllib3.util.retry import Retry
+
+from fetcher import RETRY_STATUSES
+
+
+# Rows per POST and number of POSTs in flight
+CHUNK_SIZE = 50000
+MAX_WORKERS = 4
+
+# Table name -> on_conflict key of the upsert (see sql/schema.sql)
+CONFLICT_KEYS = {
+    'competitions': 'id',
+    'persons': 'id',
+    'player_metrics': 'event,personId,date',
+    'competition_ranking': 'event,competition_id',
+    'dataset_versions': 'event',
+}
+
+
+############
+### Tables
+############
+
+def _with_event(df, event):
+    return df.assign(event=event)[['event'] + list(df.columns)]
+
+
+def _by_event(frames):
+    """
+    Concatenate per-event frames with their event as the first column.
+    """
+    return pd.concat([_with_event(df, event) for event, df in frames.items()], ignore_index=True)
+
+
+class EventParts:
+    """
+    Per-event checkpoint.FrameParts read one part at a time, with their event as
+    the first column: a table that is loaded / exported part by part since it
+    may not fit in memory. len() is the total number of rows.
+    """
+
+    def __init__(self, parts):
+        self.parts = parts
+
+    def __iter__(self):
+        for event, parts in self.parts.items():
+            for df in parts:
+                yield _with_event(df, event)
+
+    def __len__(self):
+        return sum(len(parts) for parts in self.parts.values())
+
+
+def build_tables(filtered_df, persons_df, rankings, comp_rankings):
+    """
+    Shape the pipeline outputs into the Supabase tables. `rankings` maps each
+    event to its ranking as FrameParts, `comp_rankings` to its competition
+    ranking frame.
+    dataset_versions holds a fingerprint of each event's player_metrics, loaded
+    last so that a new version is only visible once its rows are.
+    Returns:
+    - dict table name -> pd.DataFrame (EventParts for player_metrics), in load order
+    """
+    competitions = filtered_df[['id', 'comp_id', 'name', 'city', 'country', 'date_from', 'date_till',
+                                'isChampionship', 'venue_coordinates_latitude', 'venue_coordinates_longitude',
+                                'externalWebsite']]
+    competition_ranking = _by_event(comp_rankings).merge(
+        filtered_df[['id', 'comp_id']], left_on='competition_id', right_on='id', how='left'
+    ).drop(columns='id')
+
+    return {
+        'competitions': competitions,
+        'persons': persons_df[['id', 'name', 'country']],
+        'player_metrics': EventParts(rankings),
+        'competition_ranking': competition_ranking,
+        'dataset_versions': pd.DataFrame(
+            [(event, parts.fingerprint()) for event, parts in rankings.items()], columns=['event', 'version']
+        ),
+    }
+
+
+############
+### PostgREST bulk upsert
+############
+
+class PostgrestLoader:
+    """
+    Bulk upsert of DataFrames into PostgREST (Supabase or a local instance).
+
+    Frames are serialized chunk by chunk and several chunks are POSTed in parallel
+    with `Prefer: resolution=merge-duplicates`, so re-running a load is idempotent.
+    """
+
+    def __init__(self, rest_url, api_key=None, chunk_size=CHUNK_SIZE, max_workers=MAX_WORKERS, timeout=(10, 300)):
+        self.rest_url = rest_url.rstrip('/')
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.stats = {'requests': 0, 'bytes': 0}
+        self._stats_lock = threading.Lock()
+
+        # Upserts are idempotent, so POSTs can be retried safely
+        retry = Retry(
+            total=5,
+            backoff_factor=1,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['POST']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_maxsize=max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+        if api_key:
+            self.session.headers.update({'apikey': api_key, 'Authorization': f'Bearer {api_key}'})
+
+    def _post_chunk(self, table, on_conflict, chunk):
+        body = chunk.to_json(orient='records', date_format='iso', date_unit='s').encode('utf-8')
+        with self._stats_lock:
+            self.stats['requests'] += 1
+            self.stats['bytes'] += len(body)
+        response = self.session.post(
+            f'{self.rest_url}/{table}',
+            params={'on_conflict': on_conflict},
+            data=body,
+            headers={'Prefer': 'resolution=merge-duplicates,return=minimal'},
+            timeout=self.timeout,
+        )
+        if response.status_code >= 300:
+            raise RuntimeError(f"Upsert into {table} failed: HTTP {response.status_code} {response.text[:500]}")
+        return len(chunk)
+
+    def upsert(self, table, df, on_conflict):
+        """
+        Upsert all rows of `df` into `table`, `max_workers` chunks at a time.
+        Returns:
+        - number of rows sent
+        """
+        # Duplicate keys inside one statement are rejected by Postgres
+        df = df.drop_duplicates(subset=on_conflict.split(','), keep='last')
+        starts = range(0, len(df), self.chunk_size)
+
+        sent = 0
+        with tqdm(total=len(df), desc=f"Loading {table}", unit='rows') as progress:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [
+                    executor.submit(self._post_chunk, table, on_conflict, df.iloc[start:start + self.chunk_size])
+                    for start in starts
+                ]
+                for future in as_completed(futures):
+                    rows = future.result()
+                    sent += rows
+                    progress.update(rows)
+        return sent
+
+    def refresh_latest(self):
+        """
+        Rebuild the latest_* materialized views once all tables are loaded.
+        """
+        response = self.session.post(f'{self.rest_url}/rpc/refresh_latest_views', json={}, timeout=self.timeout)
+        if response.status_code >= 300:
+            raise RuntimeError(f"Refreshing latest views failed: HTTP {response.status_code} {response.text[:500]}")
+
+    def load_all(self, tables):
+        for table, df in tables.items():
+            # Tables too large for memory come as parts, whose keys do not overlap
+            for part in [df] if isinstance(df, pd.DataFrame) else df:
+                self.upsert(table, part, CONFLICT_KEYS[table])
+        self.refresh_latest()
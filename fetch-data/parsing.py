@@ -0,0 +1,49 @@
+import io
+import json
+
+try:
+    import ijson
+except ImportError:  # streaming parser is optional, fall back to json + projection
+    ijson = None
+
+
+# Person fields containing any of these are never kept
+EXCLUDED_PERSON_FIELDS = ('rank', 'medals', 'records', 'results')
+
+SCALAR_EVENTS = {'string', 'number', 'boolean', 'null'}
+
+
+def _keep_person_field(key):
+    return not any(exclude in key for exclude in EXCLUDED_PERSON_FIELDS)
+
+
+def parse_person_page(content):
+    """
+    Project a persons page onto the top-level scalar fields of each person
+    (id, name, country, ...). The nested rank / medals / records / results and
+    the competition id lists are skipped without being materialized when ijson
+    is available.
+    Returns:
+    - list of dicts, one per person
+    """
+    if ijson is None:
+        items = json.loads(content).get('items', [])
+        return [
+            {k: v for k, v in item.items() if not isinstance(v, (dict, list)) and _keep_person_field(k)}
+            for item in items
+        ]
+
+    persons = []
+    person = None
+    for prefix, event, value in ijson.parse(io.BytesIO(content), use_float=True):
+        if prefix == 'items.item':
+            if event == 'start_map':
+                person = {}
+            elif event == 'end_map':
+                persons.append(person)
+                person = None
+        elif person is not None and event in SCALAR_EVENTS and prefix.count('.') == 2:
+            key = prefix[len('items.item.'):]
+            if _keep_person_field(key):
+                person[key] = value
+    return persons
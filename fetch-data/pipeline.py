@@ -0,0 +1,357 @@
+import numpy as np
+import pandas as pd
+
+from profiling import profiler
+
+
+# Rolling windows of the records, in days (record columns are '<best|average>_<days>')
+WINDOWS = [365, 90]
+RECORD_COLUMNS = [f'{col}_{days}' for days in WINDOWS for col in ('best', 'average')]
+RANK_COLUMNS = ['rank90best', 'rank90avg', 'rank365best', 'rank365avg']
+NATIONAL_RANK_COLUMNS = [f'{col}_national' for col in RANK_COLUMNS]
+
+# Rank column -> record column it ranks
+RANK_SOURCES = {
+    'rank90best': 'best_90',
+    'rank90avg': 'average_90',
+    'rank365best': 'best_365',
+    'rank365avg': 'average_365',
+}
+
+# Number of persons kept in the ranking (by mean average, or single, over all results)
+TOP_PERSONS = 20000
+
+# Round name -> round number used in the results table
+ROUND_MAPPING = {
+    'Final': 1,
+    'Second round': 2,
+    'First round': 3,
+    'Semi Final': 4,
+    'Qualification round': 5
+}
+# WCA event ids, ranked separately
+EVENTS = ['333', '222', '444', '555', '666', '777', '333bf', '333fm', '333oh',
+          'clock', 'minx', 'pyram', 'skewb', 'sq1', '444bf', '555bf', '333mbf']
+# Events ranked by single, as the WCA does: averages are rare (blindfolded) or do not exist (multi-blind)
+RANKED_BY_SINGLE = {'333bf', '444bf', '555bf', '333mbf'}
+
+# Result kind ('average' / 'best') -> ranks averaged over the top 10 participants of a competition
+# (by 90d single rank), and results averaged over its top 10 by the first of them
+COMPETITION_RANKS = {'average': ['rank90avg', 'rank365avg'], 'best': ['rank90best', 'rank365best']}
+COMPETITION_RESULTS = {'average': ['average_90', 'average_365'], 'best': ['best_90', 'best_365']}
+
+
+def ranked_metric(event):
+    """
+    Result kind an event is ranked by: 'best' for RANKED_BY_SINGLE, 'average' otherwise.
+    """
+    return 'best' if event in RANKED_BY_SINGLE else 'average'
+
+
+############
+### Competitions
+############
+
+def filter_by_event(df, *event_codes):
+    """
+    Filter a DataFrame of competitions for those that include any of the events.
+    Returns:
+    - pd.DataFrame filtered to rows where one of event_codes is present in 'events'
+    """
+    event_codes = set(event_codes)
+    # 'events' holds lists, or arrays once read back from a Parquet checkpoint
+    return df[df['events'].apply(lambda x: x is not None and not isinstance(x, float) and not event_codes.isdisjoint(x))]
+
+
+############
+### Results
+############
+
+def clean_results(result_df):
+    """
+    Normalize the raw results of the wca-rest-api: DNF (-1), DNS (-2) and missing (0)
+    times become NaN, round names become numbers, one row per competition/person/round.
+    Returns:
+    - pd.DataFrame [competitionId, personId, round, best, average]
+    """
+    # drop() returns a new frame, so the caller's frame is left untouched
+    result_df = result_df.drop(columns=['solves', 'position'])
+    # NaN rather than a large time: no sentinel is above every event's values (333mbf
+    # results have 10 digits), and fmin / rank / mean all skip NaN
+    result_df[['best', 'average']] = result_df[['best', 'average']].replace([-2, -1, 0], np.nan)
+
+    result_df['round'] = result_df['round'].map(ROUND_MAPPING).astype(int)
+
+    return result_df.drop_duplicates(subset=['competitionId', 'personId', 'round'], keep='first')
+
+
+############
+### Best performance of last 90d and 365d
+############
+
+def select_top_persons(result_df, n=TOP_PERSONS, metric='average'):
+    """
+    Persons with the best (lowest) mean `metric` ('average' or 'best') over all their results.
+    Returns:
+    - pd.Index of personId
+    """
+    return (
+        result_df.groupby('personId')[metric]
+        .mean()
+        .nsmallest(n)
+        .index
+    )
+
+
+def window_starts(keys, days, window):
+    """
+    For every row of arrays sorted by (keys, days), the first row of the same
+    key at most `window` days earlier (pandas' closed='both' time window).
+    Returns:
+    - int64 array of row positions
+    """
+    days = days - days.min()
+    # Offset every key past the previous one, so a window never reaches back into another key
+    stride = int(days.max()) + window + 1
+    sort_key = keys.astype(np.int64) * stride + days
+    return np.searchsorted(sort_key, sort_key - window, side='left')
+
+
+def _min_table(values, max_rows):
+    """
+    Sparse table of minima: level k holds, for every row, the column-wise
+    minimum (NaNs skipped) of the 2**k rows ending at it, up to spans of `max_rows`.
+    """
+    levels = [values]
+    while 2 ** len(levels) <= max_rows:
+        span = 2 ** (len(levels) - 1)
+        previous = levels[-1]
+        level = previous.copy()
+        level[span:] = np.fmin(previous[span:], previous[:-span])
+        levels.append(level)
+    return levels
+
+
+def _range_min(levels, starts):
+    # Two (possibly overlapping) spans of 2**k rows cover [start, i]
+    ends = np.arange(len(starts))
+    k = np.floor(np.log2(ends - starts + 1)).astype(np.int64)
+    result = np.empty_like(levels[0])
+    for level_k in np.unique(k):
+        at = np.flatnonzero(k == level_k)
+        table = levels[level_k]
+        result[at] = np.fmin(table[at], table[starts[at] + 2 ** level_k - 1])
+    return result
+
+
+def rolling_min(keys, days, values, windows):
+    """
+    Time-based rolling minima of several columns over several windows in one
+    pass: rows are sorted by (keys, days), window starts are found by binary
+    search and every window is a range-minimum lookup in one shared sparse
+    table, so another window costs two lookups per row.
+    Returns:
+    - float array of shape (rows, len(windows) * columns), windows in order,
+      each with every column of `values`
+    """
+    values = np.asarray(values, dtype=float)
+    starts = [window_starts(keys, days, window) for window in windows]
+    max_rows = max(int((np.arange(len(values)) - start).max()) + 1 for start in starts)
+    levels = _min_table(values, max_rows)
+    return np.hstack([_range_min(levels, start) for start in starts])
+
+
+def compute_records(result_df, filtered_df, persons):
+    """
+    Weekly rolling best/average (over each of WINDOWS) for every person in `persons`.
+    Each person's rows only depend on their own results, so the function can be
+    run on any subset of persons.
+    Returns:
+    - pd.DataFrame [date, personId, *RECORD_COLUMNS] sorted by personId, date
+    """
+    with profiler.stage('rolling', rows_in=len(result_df)) as stage:
+        # Step 1: Merge competitions and results
+        df = result_df[result_df['personId'].isin(persons)]
+        df = df.merge(filtered_df[['id', 'date_from']], left_on='competitionId', right_on='id')
+        df = df.drop(columns='id')
+        df['date_from'] = pd.to_datetime(df['date_from'])
+        if df.empty:
+            return pd.DataFrame({'date': pd.Series(dtype='datetime64[ns]'), 'personId': pd.Series(dtype=object),
+                                 **{col: pd.Series(dtype=float) for col in RECORD_COLUMNS}})
+
+        # Step 2: Compute rolling performance, every window in one sweep over the sorted rows
+        df = df.sort_values(['personId', 'date_from'], kind='stable')
+        row_codes, row_persons = pd.factorize(df['personId'])
+        days = df['date_from'].to_numpy().astype('datetime64[D]').astype(np.int64)
+        rolled = rolling_min(row_codes, days, df[['best', 'average']].to_numpy(dtype=float), WINDOWS)
+        stage['rows_out'] = len(rolled)
+
+    with profiler.stage('weekly_grid', rows_in=len(rolled)) as stage:
+        # Step 3: Reduce to weekly level only (1970-01-01 is a Thursday: weeks start on Monday)
+        row_weeks = days - (days + 3) % 7
+        is_new = np.r_[True, (row_codes[1:] != row_codes[:-1]) | (row_weeks[1:] != row_weeks[:-1])]
+        week_start = np.flatnonzero(is_new)
+        weekly = np.fmin.reduceat(rolled, week_start, axis=0)
+
+        # Step 4: Expand between first and last week per person on a weekly grid.
+        # The weeks are sorted by person, week: each person is one contiguous block.
+        person_codes = row_codes[week_start]
+        week_days = row_weeks[week_start]
+        persons = row_persons
+
+        block_start = np.flatnonzero(np.r_[True, person_codes[1:] != person_codes[:-1]])
+        block_end = np.r_[block_start[1:], len(week_days)] - 1
+        first_week = week_days[block_start]
+        n_weeks = (week_days[block_end] - first_week) // 7 + 1
+
+        grid_offset = np.cumsum(n_weeks) - n_weeks
+        grid_person = np.repeat(np.arange(len(persons)), n_weeks)
+        grid_week = np.repeat(first_week, n_weeks) + 7 * (np.arange(n_weeks.sum()) - np.repeat(grid_offset, n_weeks))
+
+        # Step 5: Scatter the weekly minima onto the grid and forward fill within each person
+        values = np.full((len(grid_week), len(RECORD_COLUMNS)), np.nan)
+        row_pos = grid_offset[person_codes] + (week_days - first_week[person_codes]) // 7
+        values[row_pos] = weekly
+
+        # Weeks with results are kept as they are, even when NaN (only DNFs in the windows)
+        is_filled = np.zeros(len(grid_week), dtype=bool)
+        is_filled[row_pos] = True
+        is_filled[grid_offset] = True
+        fill_from = np.where(is_filled, np.arange(len(grid_week)), 0)
+        fill_from = np.maximum.accumulate(fill_from)
+        values = values[fill_from]
+
+        record_df = pd.DataFrame(values, columns=RECORD_COLUMNS)
+        record_df.insert(0, 'date', grid_week.astype('datetime64[D]').astype(df['date_from'].dtype))
+        record_df.insert(1, 'personId', persons[grid_person])
+        stage['rows_out'] = len(record_df)
+    return record_df
+
+
+############
+### Player World and National Ranking
+############
+
+def compute_rankings(record_df, persons_df):
+    """
+    World and national ranks of every person on every date for the four metrics
+    (best/average x 90d/365d), with 'min' tie semantics. All metrics are ranked in
+    one grouped pass per scope: by date for the world, by date and country for the
+    national ranks. Dates are independent, so any date range can be ranked on its own.
+    Returns:
+    - pd.DataFrame [date, personId, RANK_COLUMNS, RECORD_COLUMNS, country, NATIONAL_RANK_COLUMNS]
+      sorted by date, personId
+    """
+    combined_df = record_df.sort_values(['date', 'personId']).reset_index(drop=True)
+    countries = persons_df.drop_duplicates(subset='id', keep='first').set_index('id')['country']
+    country = combined_df['personId'].map(countries)
+
+    metrics = combined_df[list(RANK_SOURCES.values())]
+    with profiler.stage('world_ranking', rows_in=len(metrics)):
+        world = metrics.groupby(combined_df['date']).rank(method='min')
+    with profiler.stage('national_ranking', rows_in=len(metrics)):
+        national = metrics.groupby([combined_df['date'], country]).rank(method='min')
+
+    with profiler.stage('merge', rows_in=len(combined_df)) as stage:
+        for position, (rank_col, metric) in enumerate(RANK_SOURCES.items()):
+            combined_df.insert(2 + position, rank_col, world[metric])
+        combined_df['country'] = country
+        for rank_col, metric in RANK_SOURCES.items():
+            combined_df[f'{rank_col}_national'] = national[metric]
+        stage['rows_out'] = len(combined_df)
+    return combined_df
+
+
+############
+### Competition ranking
+############
+
+def _first_row_on_or_after(participants, frame, columns):
+    """
+    For every (competition, person) pair, the person's first row of `frame`
+    dated on or after the competition (sorted as-of join).
+    Pairs without such a row are dropped.
+    """
+    frame = frame[['date', 'personId'] + columns].sort_values('date')
+    # Frames read back from Parquet hold strings, freshly computed ones objects: merge_asof needs one type
+    frame = frame.astype({'personId': participants['personId'].dtype})
+    matched = pd.merge_asof(
+        participants, frame,
+        left_on='date_from', right_on='date', by='personId',
+        direction='forward', allow_exact_matches=True,
+    )
+    return matched.dropna(subset=['date'])
+
+
+def _top10_mean(matched, sort_col, mean_cols):
+    """
+    Mean of `mean_cols` over the 10 participants with the lowest `sort_col` in each
+    competition (ties broken by personId, as nsmallest on a personId-ordered frame).
+    """
+    top10 = (
+        matched.dropna(subset=[sort_col])
+        .sort_values(['competitionId', sort_col, 'personId'], kind='stable')
+        .groupby('competitionId', sort=False)
+        .head(10)
+    )
+    return top10.groupby('competitionId')[mean_cols].mean()
+
+
+def competition_participants(comps_df, result_df, date_dtype):
+    """
+    Every (competition, person) pair of the competitions in comps_df, with the
+    competition date as `date_dtype`, sorted by date.
+    """
+    comps = comps_df[['id', 'date_from']].drop_duplicates(subset='id', keep='first')
+
+    participants = result_df[['competitionId', 'personId']].drop_duplicates()
+    participants = participants.merge(comps, left_on='competitionId', right_on='id').drop(columns='id')
+    participants['date_from'] = pd.to_datetime(participants['date_from']).astype(date_dtype)
+    return participants.sort_values('date_from')
+
+
+def match_ranks(participants, ranking_df, metric='average'):
+    columns = list(dict.fromkeys(['rank90best'] + COMPETITION_RANKS[metric]))
+    return _first_row_on_or_after(participants, ranking_df, columns)
+
+
+def match_performances(participants, record_df, metric='average'):
+    record_df = record_df.astype({'date': participants['date_from'].dtype})
+    return _first_row_on_or_after(participants, record_df, COMPETITION_RESULTS[metric])
+
+
+def rank_competitions(comps_df, valid_ranks, valid_perf, metric='average'):
+    """
+    Competition strength from the rank / performance matches of all their participants,
+    on the `metric` results (for events ranked by single, the *avg columns hold single ranks / results).
+    Returns:
+    - pd.DataFrame, one row per competition in comps_df order
+    """
+    comps = comps_df[['id']].drop_duplicates(subset='id', keep='first')
+
+    # Ranking data: top 10 by 90d best rank
+    rank_stats = _top10_mean(valid_ranks, 'rank90best', COMPETITION_RANKS[metric])
+    rank_stats.columns = ['rank90avg_avg', 'rank365avg_avg']
+
+    # Performance data: top 10 by 90d result
+    results = COMPETITION_RESULTS[metric]
+    perf_stats = _top10_mean(valid_perf, results[0], results)
+    perf_stats.columns = ['perf90avg', 'perf365avg']
+
+    comp_ranking_df = comps.rename(columns={'id': 'competition_id'})
+    comp_ranking_df = comp_ranking_df.join(rank_stats, on='competition_id').join(perf_stats, on='competition_id')
+    return comp_ranking_df.reset_index(drop=True)
+
+
+def compute_competition_ranking(comps_df, result_df, ranking_df, record_df, metric='average'):
+    """
+    Strength of each competition in comps_df: average rank / performance (on the
+    `metric` results) of its top 10 participants on the first ranking week on or
+    after the competition.
+    All competitions are handled at once with an as-of join and grouped aggregates.
+    Returns:
+    - pd.DataFrame, one row per competition in comps_df order
+    """
+    participants = competition_participants(comps_df, result_df, ranking_df['date'].dtype)
+    return rank_competitions(comps_df, match_ranks(participants, ranking_df, metric),
+                             match_performances(participants, record_df, metric), metric)
@@ -0,0 +1,182 @@
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+MB = 1024 * 1024
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss():
+    """
+    Resident set size of this process in bytes. Falls back to the process peak
+    where /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageProfiler:
+    """
+    Per-stage wall time, CPU time, peak RSS, row counts and HTTP counters.
+
+    Stages nest: a stage opened inside another one records it as its parent.
+    A background thread samples RSS while any stage is open, so each stage
+    gets its own peak rather than the process high-water mark.
+    HTTP counters come from sources registered with add_counters
+    (e.g. Fetcher.stats); each stage records how much they grew during it.
+    """
+
+    def __init__(self, sample_interval=0.05):
+        self.sample_interval = sample_interval
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.stages = []
+        self.counter_sources = {}
+        self._open = []
+        self._lock = threading.Lock()
+        self._sampler = None
+
+    def _after_fork(self):
+        # A forked worker starts with no stages and its own lock and sampler
+        self._lock = threading.Lock()
+        self.stages = []
+        self._open = []
+        self._sampler = None
+        self.counter_sources = {}
+
+    def add_counters(self, name, func):
+        self.counter_sources[name] = func
+
+    def reset(self):
+        """
+        Forget the recorded stages (e.g. between benchmark runs).
+        """
+        with self._lock:
+            self.stages = [entry for entry in self.stages if entry in self._open]
+
+    def add_stages(self, stages, prefix):
+        """
+        Append the stages recorded by another process (e.g. a pool worker),
+        their names prefixed with `prefix`.
+        """
+        with self._lock:
+            for entry in stages:
+                parent = entry['parent'] and f"{prefix}/{entry['parent']}"
+                self.stages.append(dict(entry, stage=f"{prefix}/{entry['stage']}", parent=parent))
+
+    def _read_counters(self):
+        return {name: dict(func()) for name, func in self.counter_sources.items()}
+
+    def _sample(self):
+        while True:
+            rss = current_rss()
+            with self._lock:
+                if not self._open:
+                    self._sampler = None
+                    return
+                for entry in self._open:
+                    entry['_peak_rss'] = max(entry['_peak_rss'], rss)
+            time.sleep(self.sample_interval)
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        Profile the enclosed block. Set entry['rows_out'] (and optionally
+        entry['rows_in']) on the yielded dict.
+        """
+        rss = current_rss()
+        entry = {
+            'stage': name,
+            'parent': None,
+            'rows_in': rows_in,
+            'rows_out': None,
+            '_peak_rss': rss,
+        }
+        counters_before = self._read_counters()
+        with self._lock:
+            if self._open:
+                entry['parent'] = self._open[-1]['stage']
+            self._open.append(entry)
+            self.stages.append(entry)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, daemon=True)
+                self._sampler.start()
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield entry
+        finally:
+            entry['wall_s'] = round(time.perf_counter() - wall_start, 3)
+            entry['cpu_s'] = round(time.process_time() - cpu_start, 3)
+            with self._lock:
+                self._open.remove(entry)
+                peak = max(entry.pop('_peak_rss'), current_rss())
+                for parent in self._open:
+                    parent['_peak_rss'] = max(parent['_peak_rss'], peak)
+                entry['peak_rss_mb'] = round(peak / MB, 1)
+            counters_after = self._read_counters()
+            entry['http'] = {
+                source: {key: value - counters_before[source].get(key, 0) for key, value in counters.items()}
+                for source, counters in counters_after.items()
+            }
+
+    ############
+    ### Reports
+    ############
+
+    def report(self):
+        return {
+            'started_at': self.started_at,
+            'written_at': datetime.now().isoformat(timespec='seconds'),
+            'argv': sys.argv,
+            'stages': [{k: v for k, v in entry.items() if not k.startswith('_')} for entry in self.stages],
+        }
+
+    def summary(self):
+        header = f"{'stage':<24}{'wall s':>9}{'cpu s':>9}{'peak MB':>10}{'rows in':>12}{'rows out':>12}{'http req':>10}{'http MB':>9}"
+        lines = [header, '-' * len(header)]
+        for entry in self.stages:
+            name = ('  ' if entry['parent'] else '') + entry['stage']
+            http = entry.get('http', {})
+            requests_made = sum(c.get('requests', 0) for c in http.values())
+            http_bytes = sum(c.get('bytes', 0) for c in http.values())
+            lines.append(
+                f"{name:<24}{entry.get('wall_s', 0):>9.2f}{entry.get('cpu_s', 0):>9.2f}"
+                f"{entry.get('peak_rss_mb', 0):>10.1f}{_fmt_rows(entry['rows_in']):>12}{_fmt_rows(entry['rows_out']):>12}"
+                f"{requests_made:>10}{http_bytes / MB:>9.1f}"
+            )
+        return '\n'.join(lines)
+
+    def write(self, directory):
+        """
+        Write the JSON report and the summary table to `directory`, one pair per run.
+        Returns:
+        - path of the JSON report
+        """
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        json_path = os.path.join(directory, f'profile-{stamp}.json')
+        with open(json_path, 'w') as f:
+            json.dump(self.report(), f, indent=2, default=str)
+        with open(os.path.join(directory, f'profile-{stamp}.txt'), 'w') as f:
+            f.write(self.summary() + '\n')
+        return json_path
+
+
+def _fmt_rows(rows):
+    return '' if rows is None else f'{rows:,}'
+
+
+# Shared by historical.py and the pipeline functions
+profiler = StageProfiler()
+os.register_at_fork(after_in_child=profiler._after_fork)
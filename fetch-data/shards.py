@@ -0,0 +1,168 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from pipeline import (
+    competition_participants,
+    compute_competition_ranking,
+    compute_rankings,
+    compute_records,
+    match_performances,
+    match_ranks,
+    rank_competitions,
+)
+from profiling import profiler
+
+
+# Peak bytes per weekly row held by a stage: records or ranks, and their working copies
+ROW_BYTES = 1000
+DEFAULT_MEMORY_BUDGET_MB = 1024
+# Rows per Parquet row group of the record shards, so a date block only reads its own dates
+ROW_GROUP_SIZE = 50000
+# A person's first weekly row on or after a competition is at most this many days later
+MATCH_DAYS = 6
+
+
+def budget_rows(memory_budget_mb):
+    return max(1, memory_budget_mb * 2 ** 20 // ROW_BYTES)
+
+
+############
+### Records, per shard of persons
+############
+
+def shard_of(person_ids, n_shards):
+    """
+    Shard of every personId, by hash: the same on every run and machine.
+    Returns:
+    - int64 array
+    """
+    return (pd.util.hash_array(np.asarray(person_ids, dtype=object)) % n_shards).astype(np.int64)
+
+
+def plan_shards(result_df, filtered_df, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    """
+    Number of person shards for the weekly rows of one shard (a row per person
+    and week between their first and last competition) to fit in the budget.
+    """
+    dated = result_df[['competitionId', 'personId']].merge(
+        filtered_df[['id', 'date_from']], left_on='competitionId', right_on='id'
+    )
+    dates = pd.to_datetime(dated['date_from']).groupby(dated['personId']).agg(['min', 'max'])
+    weeks = ((dates['max'] - dates['min']).dt.days // 7 + 2).sum()
+    return max(1, math.ceil(weeks / budget_rows(memory_budget_mb)))
+
+
+def sharded_records(result_df, filtered_df, n_shards):
+    """
+    compute_records for every person, one shard of persons at a time. Each shard
+    is sorted by date, so it can be read back one date range at a time.
+    Returns:
+    - generator of the record frames of each shard
+    """
+    shards = shard_of(result_df['personId'], n_shards)
+    for shard in range(n_shards):
+        shard_results = result_df[shards == shard]
+        record_df = compute_records(shard_results, filtered_df, shard_results['personId'].unique())
+        yield record_df.sort_values(['date', 'personId'], kind='stable', ignore_index=True)
+
+
+############
+### Rankings, per block of dates
+############
+
+def plan_date_blocks(record_parts, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    """
+    Consecutive date ranges holding at most the budget's rows over all shards
+    (a single date above it gets a block of its own).
+    Returns:
+    - list of (first date, last date)
+    """
+    rows_per_date = pd.concat(
+        [part['date'].value_counts() for part in record_parts.read(columns=['date'])]
+    ).groupby(level=0).sum().sort_index()
+
+    blocks, first, rows = [], None, 0
+    max_rows = budget_rows(memory_budget_mb)
+    for date, count in rows_per_date.items():
+        if first is not None and rows + count > max_rows:
+            blocks.append((first, last))
+            first, rows = None, 0
+        if first is None:
+            first = date
+        last, rows = date, rows + count
+    if first is not None:
+        blocks.append((first, last))
+    return blocks
+
+
+def block_ranking(record_parts, persons_df, block):
+    """
+    compute_rankings on one block of dates, read from every record shard. Dates
+    are ranked independently, so the blocks together rank every person.
+    """
+    first, last = block
+    record_df = pd.concat(record_parts.read(filters=[('date', '>=', first), ('date', '<=', last)]),
+                          ignore_index=True)
+    return compute_rankings(record_df, persons_df)
+
+
+def sharded_rankings(record_parts, persons_df, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    """
+    compute_rankings over all the record shards (FrameParts), in blocks of dates
+    that fit the memory budget.
+    Returns:
+    - generator of the ranking frames of each block
+    """
+    with profiler.stage('date_blocks', rows_in=len(record_parts)) as stage:
+        blocks = plan_date_blocks(record_parts, memory_budget_mb)
+        stage['rows_out'] = len(blocks)
+    if not blocks:
+        # No records: one empty ranking frame, with its columns
+        yield compute_rankings(pd.concat(record_parts, ignore_index=True), persons_df)
+    for block in blocks:
+        yield block_ranking(record_parts, persons_df, block)
+
+
+############
+### Competition ranking
+############
+
+def sharded_competition_ranking(comps_df, result_df, ranking_parts, record_parts, metric='average'):
+    """
+    compute_competition_ranking over rankings split by dates and records split
+    by persons. A participant's matching week falls in the ranking block holding
+    the competition date, or in the next one: matches are gathered block by
+    block and the earliest one kept.
+    """
+    participants = None
+    rank_matches = []
+    for ranking_df in ranking_parts:
+        if ranking_df.empty:
+            continue
+        if participants is None:
+            participants = competition_participants(comps_df, result_df, ranking_df['date'].dtype)
+        first, last = ranking_df['date'].min(), ranking_df['date'].max()
+        in_block = participants['date_from'].between(first - pd.Timedelta(days=MATCH_DAYS), last)
+        rank_matches.append(match_ranks(participants[in_block], ranking_df, metric))
+    if participants is None:
+        # No ranking rows at all: every competition gets empty statistics
+        return compute_competition_ranking(comps_df, result_df, pd.concat(ranking_parts, ignore_index=True),
+                                           pd.concat(record_parts, ignore_index=True), metric)
+    valid_ranks = (
+        pd.concat(rank_matches, ignore_index=True)
+        .sort_values('date', kind='stable')
+        .drop_duplicates(subset=['competitionId', 'personId'], keep='first')
+    )
+
+    # Performances are matched in the record shards, which hold every week of their persons
+    n_shards = len(record_parts.files)
+    participant_shards = shard_of(participants['personId'], n_shards)
+    perf_matches = []
+    for shard, record_df in enumerate(record_parts):
+        if len(record_df) and (shard_of(record_df['personId'].unique(), n_shards) != shard).any():
+            raise ValueError("The records checkpoint is not sharded by person: rerun the records stage with --all-persons")
+        perf_matches.append(match_performances(participants[participant_shards == shard], record_df, metric))
+
+    return rank_competitions(comps_df, valid_ranks, pd.concat(perf_matches, ignore_index=True), metric)
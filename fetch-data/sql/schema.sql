@@ -0,0 +1,127 @@
+-- Tables loaded by historical.py --load (see loader.py).
+-- The upsert keys must match loader.CONFLICT_KEYS.
+
+create table if not exists competitions (
+    id text primary key,
+    comp_id text,
+    name text,
+    city text,
+    country text,
+    date_from date,
+    date_till date,
+    "isChampionship" boolean,
+    venue_coordinates_latitude double precision,
+    venue_coordinates_longitude double precision,
+    "externalWebsite" text
+);
+create index if not exists competitions_comp_id_idx on competitions (comp_id);
+
+create table if not exists persons (
+    id text primary key,
+    name text,
+    country text
+);
+
+create table if not exists player_metrics (
+    event text not null,
+    date date not null,
+    "personId" text not null,
+    rank90best double precision,
+    rank90avg double precision,
+    rank365best double precision,
+    rank365avg double precision,
+    best_365 double precision,
+    average_365 double precision,
+    best_90 double precision,
+    average_90 double precision,
+    country text,
+    rank90best_national double precision,
+    rank90avg_national double precision,
+    rank365best_national double precision,
+    rank365avg_national double precision,
+    primary key (event, "personId", date)
+);
+
+create table if not exists competition_ranking (
+    event text not null,
+    competition_id text not null,
+    comp_id text,
+    rank90avg_avg double precision,
+    rank365avg_avg double precision,
+    perf90avg double precision,
+    perf365avg double precision,
+    primary key (event, competition_id)
+);
+
+-- Fingerprint of each event's player_metrics, written after them (the dashboard names bulk exports by it)
+create table if not exists dataset_versions (
+    event text primary key,
+    version text not null
+);
+
+-- Databases created before rankings were split by event hold 3x3 rows only:
+-- add the event column to the keys, and rebuild the views below with it
+do $$
+begin
+    if not exists (select 1 from information_schema.columns
+                   where table_name = 'player_metrics' and column_name = 'event') then
+        drop materialized view if exists latest_player_metrics;
+        drop materialized view if exists latest_competition_ranking;
+        alter table player_metrics add column event text not null default '333';
+        alter table player_metrics drop constraint player_metrics_pkey;
+        alter table player_metrics add primary key (event, "personId", date);
+        alter table competition_ranking add column event text not null default '333';
+        alter table competition_ranking drop constraint competition_ranking_pkey;
+        alter table competition_ranking add primary key (event, competition_id);
+        drop index if exists competition_ranking_comp_id_idx;
+        create index competition_ranking_comp_id_idx on competition_ranking (event, comp_id);
+    end if;
+end
+$$;
+create index if not exists competition_ranking_comp_id_idx on competition_ranking (event, comp_id);
+
+
+-- Leaderboards read by the dashboard, per event: each player's most recent week, and every ranked competition
+
+create materialized view if not exists latest_player_metrics as
+select distinct on (m.event, m."personId")
+    m.event, p.id, p.name, p.country,
+    m.best_365, m.average_365, m.best_90, m.average_90,
+    m.rank90best, m.rank90avg, m.rank365best, m.rank365avg,
+    m.rank90best_national, m.rank90avg_national, m.rank365best_national, m.rank365avg_national
+from player_metrics m
+join persons p on p.id = m."personId"
+order by m.event, m."personId", m.date desc;
+create unique index if not exists latest_player_metrics_id_idx on latest_player_metrics (event, id);
+create index if not exists latest_player_metrics_rank_idx on latest_player_metrics (event, rank365avg, id);
+-- Events ranked by single (pipeline.RANKED_BY_SINGLE)
+create index if not exists latest_player_metrics_rank_best_idx on latest_player_metrics (event, rank365best, id);
+
+-- Views created before comp_id (the id the dashboard opens a competition with) was exposed are rebuilt
+do $$
+begin
+    if exists (select 1 from pg_matviews where matviewname = 'latest_competition_ranking')
+       and not exists (select 1 from pg_attribute
+                       where attrelid = 'latest_competition_ranking'::regclass and attname = 'comp_id' and not attisdropped) then
+        drop materialized view latest_competition_ranking;
+    end if;
+end
+$$;
+
+create materialized view if not exists latest_competition_ranking as
+select
+    r.event, r.competition_id, r.comp_id, c.name, c.city, c.country, c.date_from,
+    r.rank90avg_avg, r.rank365avg_avg, r.perf90avg, r.perf365avg
+from competition_ranking r
+join competitions c on c.id = r.competition_id;
+create unique index if not exists latest_competition_ranking_id_idx on latest_competition_ranking (event, competition_id);
+create index if not exists latest_competition_ranking_rank_idx on latest_competition_ranking (event, rank365avg_avg, competition_id);
+
+-- Called by the loader after every load; concurrent refresh keeps the views readable meanwhile
+create or replace function refresh_latest_views() returns void
+language plpgsql security definer as $$
+begin
+    refresh materialized view concurrently latest_player_metrics;
+    refresh materialized view concurrently latest_competition_ranking;
+end;
+$$;
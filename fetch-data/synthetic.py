@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+
+COUNTRIES = ['US', 'CN', 'IN', 'BR', 'FR', 'DE', 'GB', 'PL', 'AU', 'CA', 'ES', 'IT', 'JP', 'KR', 'PH', 'RU', 'MX', 'PE', 'CO', 'NA']
+# Share of persons / competitions per country (roughly the WCA's skew)
+COUNTRY_WEIGHTS = np.array([14, 12, 10, 8, 6, 6, 5, 5, 4, 4, 4, 3, 3, 3, 3, 3, 2, 2, 2, 1], dtype=float)
+OTHER_EVENTS = ['222', '444', '555', 'pyram', 'skewb', 'clock', 'minx', 'sq1', '333oh', '333bf']
+
+# Competitions per person, about the WCA's ratio
+PERSONS_PER_COMPETITION = 16
+# Mean number of competitions attended by a person
+MEAN_COMPETITIONS = 8
+# Share of averages that are DNF (-1) or missing (0, e.g. cut-off not made), and of DNF singles
+DNF_AVERAGE_RATE = 0.06
+MISSING_AVERAGE_RATE = 0.03
+DNF_BEST_RATE = 0.01
+
+ROUND_NAMES = np.array(['First round', 'Second round', 'Semi Final', 'Final'])
+# Competitions with 1 to 4 rounds -> position in ROUND_NAMES of each of their rounds
+ROUND_LAYOUTS = np.array([
+    [3, 3, 3, 3],
+    [0, 3, 3, 3],
+    [0, 1, 3, 3],
+    [0, 1, 2, 3],
+])
+
+
+def _wca_ids(first_years):
+    """
+    Unique WCA-shaped ids: registration year, four letters, two digits.
+    """
+    n = len(first_years)
+    letters = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    number = np.arange(n) // 100
+    codes = [letters[(number // 26 ** k) % 26] for k in range(3, -1, -1)]
+    suffix = np.char.zfill((np.arange(n) % 100).astype(str), 2)
+    ids = first_years.astype(str)
+    for code in codes:
+        ids = np.char.add(ids, code)
+    return np.char.add(ids, suffix)
+
+
+def generate(n_persons, n_competitions=None, start='2010-01-01', end='2025-06-30', seed=0):
+    """
+    Deterministic WCA-shaped 3x3 data for benchmarks and tests.
+    - competitions: the columns load_competitions keeps (dates, events, country, ...)
+    - persons: id, name, country
+    - results: raw wca-rest-api rows (round names, position, best / average in
+      centiseconds with -1 / 0 sentinels), to be passed through clean_results
+    Returns:
+    - (competitions_df, persons_df, results_df)
+    """
+    rng = np.random.default_rng(seed)
+    n_competitions = n_competitions or max(50, n_persons // PERSONS_PER_COMPETITION)
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    country_p = COUNTRY_WEIGHTS / COUNTRY_WEIGHTS.sum()
+
+    # Competitions: more of them every year, mostly on weekends
+    span_days = (end - start).days
+    offsets = np.sort((span_days * np.sqrt(rng.random(n_competitions))).astype(int))
+    date_from = start + pd.to_timedelta(offsets, unit='D')
+    date_from = date_from + pd.to_timedelta((5 - date_from.dayofweek) % 7, unit='D')
+    years = date_from.year.to_numpy()
+    comp_ids = np.char.add(np.char.add('Open', np.arange(n_competitions).astype(str)), years.astype(str))
+    events = [['333'] + rng.choice(OTHER_EVENTS, rng.integers(0, 6), replace=False).tolist() for _ in range(n_competitions)]
+    competitions = pd.DataFrame({
+        'id': comp_ids,
+        'name': [f'Open {i} {year}' for i, year in enumerate(years)],
+        'city': 'City',
+        'country': rng.choice(COUNTRIES, n_competitions, p=country_p),
+        'isCanceled': False,
+        'events': events,
+        'externalWebsite': None,
+        'date_from': date_from,
+        'date_till': date_from + pd.to_timedelta(rng.integers(0, 3, n_competitions), unit='D'),
+        'venue_coordinates_latitude': rng.uniform(-60, 70, n_competitions),
+        'venue_coordinates_longitude': rng.uniform(-180, 180, n_competitions),
+        'comp_id': np.char.add('Open', np.arange(n_competitions).astype(str)),
+        'isChampionship': rng.random(n_competitions) < 0.02,
+    })
+
+    # Persons: a skill level (seconds for a 3x3 average) and a first competition
+    skill = np.exp(rng.normal(np.log(22), 0.45, n_persons)).clip(5, 120)
+    first_comp = rng.integers(0, n_competitions, n_persons)
+    persons = pd.DataFrame({
+        'id': _wca_ids(years[first_comp]),
+        'name': [f'Person {i}' for i in range(n_persons)],
+        'country': rng.choice(COUNTRIES, n_persons, p=country_p),
+    })
+
+    # Participations: each person attends later competitions with random gaps
+    counts = rng.geometric(1 / MEAN_COMPETITIONS, n_persons)
+    person_idx = np.repeat(np.arange(n_persons), counts)
+    gaps = rng.integers(1, 12, len(person_idx))
+    block_start = np.r_[0, np.cumsum(counts)[:-1]]
+    gaps[block_start] = 0
+    steps = np.cumsum(gaps)
+    comp_idx = first_comp[person_idx] + steps - np.repeat(steps[block_start], counts)
+    keep = comp_idx < n_competitions
+    person_idx, comp_idx = person_idx[keep], comp_idx[keep]
+
+    # Rounds: each competition has 1 to 4, better solvers get through more of them
+    comp_rounds = rng.choice([1, 2, 3, 4], n_competitions, p=[0.3, 0.35, 0.3, 0.05])
+    percentile = pd.Series(skill).rank(pct=True).to_numpy()[person_idx]
+    reached = 1 + np.floor(percentile ** 2 * rng.uniform(0.5, 1.5, len(person_idx)) * 4).astype(int)
+    n_rounds = np.minimum(reached, comp_rounds[comp_idx])
+    row_person = np.repeat(person_idx, n_rounds)
+    row_comp = np.repeat(comp_idx, n_rounds)
+    round_no = np.arange(len(row_person)) - np.repeat(np.cumsum(n_rounds) - n_rounds, n_rounds)
+    round_code = ROUND_LAYOUTS[comp_rounds[row_comp] - 1, round_no]
+
+    # Times improve over a career and vary per round
+    years_active = (date_from.to_numpy()[row_comp] - date_from.to_numpy()[first_comp[row_person]]) / np.timedelta64(365, 'D')
+    level = skill[row_person] * np.exp(-0.12 * np.minimum(years_active, 6))
+    average = (level * rng.lognormal(0, 0.06, len(row_person)) * 100).round().astype(np.int64)
+    best = (average * rng.uniform(0.8, 0.97, len(row_person))).round().astype(np.int64)
+    average[rng.random(len(average)) < DNF_AVERAGE_RATE] = -1
+    average[rng.random(len(average)) < MISSING_AVERAGE_RATE] = 0
+    best[rng.random(len(best)) < DNF_BEST_RATE] = -1
+
+    results = pd.DataFrame({
+        'competitionId': comp_ids[row_comp],
+        'personId': persons['id'].to_numpy()[row_person],
+        'round': ROUND_NAMES[round_code],
+        'best': best,
+        'average': average,
+        'solves': None,
+    })
+    # Position within each round, by average then best (sentinels last)
+    sort_average = np.where(average > 0, average, np.iinfo(np.int64).max)
+    sort_best = np.where(best > 0, best, np.iinfo(np.int64).max)
+    order = np.lexsort((sort_best, sort_average, round_code, row_comp))
+    group = pd.Series(row_comp[order] * len(ROUND_NAMES) + round_code[order])
+    position = np.empty(len(order), dtype=np.int64)
+    position[order] = group.groupby(group, sort=False).cumcount().to_numpy() + 1
+    results.insert(3, 'position', position)
+    return competitions, persons, results
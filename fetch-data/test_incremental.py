@@ -0,0 +1,80 @@
+import functools
+
+import pandas as pd
+import pytest
+
+import incremental
+from incremental import load_state, run_incremental, save_state
+from pipeline import (
+    clean_results,
+    compute_competition_ranking,
+    compute_rankings,
+    compute_records,
+    select_top_persons,
+)
+from synthetic import generate
+
+
+# Fewer top persons than generated, so persons enter and leave the top between runs
+TOP = 150
+
+
+@pytest.fixture(scope='module')
+def data():
+    comps_df, persons_df, raw_df = generate(400, start='2015-01-01', end='2025-06-30', seed=1)
+    return comps_df, persons_df, clean_results(raw_df)
+
+
+@pytest.fixture(autouse=True)
+def top_persons(monkeypatch):
+    monkeypatch.setattr(incremental, 'select_top_persons', functools.partial(select_top_persons, n=TOP))
+
+
+def since_2011(comps_df):
+    return comps_df[pd.to_datetime(comps_df['date_from']) >= pd.Timestamp('2011-01-01')]
+
+
+def full_run(comps_df, persons_df, result_df, metric):
+    record_df = compute_records(result_df, comps_df, select_top_persons(result_df, n=TOP, metric=metric))
+    ranking_df = compute_rankings(record_df, persons_df)
+    comp_ranking_df = compute_competition_ranking(since_2011(comps_df), result_df, ranking_df, record_df, metric)
+    return record_df, ranking_df, comp_ranking_df
+
+
+@pytest.mark.parametrize('cutoff, country_change, metric', [
+    ('2024-01-01', False, 'average'),
+    ('2025-03-01', False, 'average'),
+    ('2025-04-01', True, 'average'),
+    # Events ranked by single (pipeline.RANKED_BY_SINGLE)
+    ('2025-03-01', False, 'best'),
+])
+def test_incremental_matches_full_run(data, tmp_path, cutoff, country_change, metric):
+    comps_df, persons_df, result_df = data
+
+    # Previous run: only the competitions before the cutoff had happened
+    old_comps = comps_df[comps_df['date_from'] < pd.Timestamp(cutoff)]
+    old_results = result_df[result_df['competitionId'].isin(old_comps['id'])]
+    record_df, ranking_df, comp_ranking_df = full_run(old_comps, persons_df, old_results, metric)
+    save_state(tmp_path, result_df=old_results, filtered_df=old_comps[['id', 'date_from']],
+               record_df=record_df, ranking_df=ranking_df, comp_ranking_df=comp_ranking_df)
+
+    if country_change:
+        # A ranked person moves: their national ranks change over their whole history
+        person_id = ranking_df['personId'].iloc[0]
+        persons_df = persons_df.copy()
+        moved = persons_df['id'] == person_id
+        persons_df.loc[moved, 'country'] = 'NA' if persons_df.loc[moved, 'country'].iloc[0] != 'NA' else 'US'
+
+    expected = full_run(comps_df, persons_df, result_df, metric)
+    actual = run_incremental(load_state(tmp_path), result_df, comps_df, since_2011(comps_df), persons_df, metric)
+
+    record_df, ranking_df, comp_ranking_df = actual
+    expected_records, expected_ranking, expected_comp_ranking = expected
+    # Rows kept from the saved state come back from Parquet with other datetime units
+    pd.testing.assert_frame_equal(record_df, expected_records.reset_index(drop=True), check_dtype=False)
+    pd.testing.assert_frame_equal(
+        ranking_df.sort_values(['date', 'personId'], ignore_index=True),
+        expected_ranking.sort_values(['date', 'personId'], ignore_index=True),
+        check_dtype=False,
+    )
+    pd.testing.assert_frame_equal(comp_ranking_df, expected_comp_ranking, check_dtype=False)
@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+from checkpoint import FrameParts, save_parts
+from pipeline import (
+    clean_results,
+    compute_competition_ranking,
+    compute_rankings,
+    compute_records,
+)
+from shards import (
+    plan_date_blocks,
+    plan_shards,
+    sharded_competition_ranking,
+    sharded_rankings,
+    sharded_records,
+)
+from synthetic import generate
+
+
+@pytest.fixture(scope='module')
+def data():
+    comps_df, persons_df, raw_df = generate(250, start='2018-01-01', end='2025-06-30', seed=2)
+    return comps_df, persons_df, clean_results(raw_df)
+
+
+@pytest.fixture(scope='module')
+def in_memory(data):
+    comps_df, persons_df, result_df = data
+    record_df = compute_records(result_df, comps_df, result_df['personId'].unique())
+    ranking_df = compute_rankings(record_df, persons_df)
+    return record_df, ranking_df
+
+
+@pytest.mark.parametrize('memory_budget_mb, metric', [(1, 'average'), (3, 'average'), (3, 'best')])
+def test_sharded_matches_in_memory(data, in_memory, tmp_path, memory_budget_mb, metric):
+    comps_df, persons_df, result_df = data
+    record_df, ranking_df = in_memory
+    comp_ranking_df = compute_competition_ranking(comps_df, result_df, ranking_df, record_df, metric)
+
+    records_dir, ranking_dir = str(tmp_path / 'records'), str(tmp_path / 'ranking')
+    n_shards = plan_shards(result_df, comps_df, memory_budget_mb)
+    # Small row groups, so the date blocks are read through the Parquet filters
+    save_parts(records_dir, sharded_records(result_df, comps_df, n_shards), row_group_size=1000)
+    record_parts = FrameParts(records_dir)
+    assert n_shards > 1 and len(plan_date_blocks(record_parts, memory_budget_mb)) > 1
+
+    save_parts(ranking_dir, sharded_rankings(record_parts, persons_df, memory_budget_mb))
+    ranking_parts = FrameParts(ranking_dir)
+    # Competitions match a participant's first week on or after them, possibly in the next date block
+    sharded_comp_ranking = sharded_competition_ranking(comps_df, result_df, ranking_parts, record_parts, metric)
+
+    pd.testing.assert_frame_equal(
+        pd.concat(record_parts, ignore_index=True).sort_values(['personId', 'date'], ignore_index=True),
+        record_df.reset_index(drop=True),
+    )
+    pd.testing.assert_frame_equal(
+        pd.concat(ranking_parts, ignore_index=True).sort_values(['date', 'personId'], ignore_index=True),
+        ranking_df,
+    )
+    pd.testing.assert_frame_equal(sharded_comp_ranking, comp_ranking_df)
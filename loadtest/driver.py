@@ -0,0 +1,432 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+import pyarrow as pa
+import websockets
+from streamlit.proto.Alert_pb2 import Alert
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from stub_server import add_fixture_args
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPT_DIR)
+
+BACK_LABEL = "← Back to main view"
+SEARCH_LABEL = "Search player or competition"
+SUGGESTION_SUFFIXES = ("· Player", "· Competition")
+
+
+class LoadTestError(Exception):
+    pass
+
+
+############
+### Processes under test
+############
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_ready(url, process, log_path, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            with urllib.request.urlopen(url, timeout=2):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up, see {log_path}")
+
+
+def start_processes(args, log_dir):
+    """
+    Start the PostgREST stub (unless --local-db) and a headless dashboard pointed at it.
+    Returns:
+    - (dashboard websocket URL, list of processes to stop)
+    """
+    env = dict(os.environ)
+    env.pop("WCA_LOCAL_DB", None)
+    processes = []
+
+    if args.local_db:
+        env["WCA_LOCAL_DB"] = os.path.abspath(args.local_db)
+    else:
+        stub_port = free_port()
+        stub_log = os.path.join(log_dir, "stub_server.log")
+        stub = subprocess.Popen(
+            [sys.executable, os.path.join(SCRIPT_DIR, "stub_server.py"), "--port", str(stub_port),
+             "--players", str(args.players), "--competitions", str(args.competitions), "--seed", str(args.seed),
+             "--latency", str(args.latency), "--jitter", str(args.jitter)],
+            stdout=open(stub_log, "w"), stderr=subprocess.STDOUT,
+        )
+        processes.append(stub)
+        wait_until_ready(f"http://127.0.0.1:{stub_port}/rest/v1/competitions?limit=1", stub, stub_log)
+        env["SUPABASE_URL"] = f"http://127.0.0.1:{stub_port}"
+
+    port = free_port()
+    dashboard_log = os.path.join(log_dir, "dashboard.log")
+    dashboard = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "streamlit_app.py",
+         "--server.headless", "true", "--server.port", str(port), "--server.fileWatcherType", "none",
+         "--browser.gatherUsageStats", "false"],
+        cwd=REPO_DIR, env=env, stdout=open(dashboard_log, "w"), stderr=subprocess.STDOUT,
+    )
+    processes.append(dashboard)
+    wait_until_ready(f"http://127.0.0.1:{port}/_stcore/health", dashboard, dashboard_log)
+    return f"ws://127.0.0.1:{port}/_stcore/stream", processes
+
+
+############
+### One browser tab
+############
+
+class Session:
+    """
+    A dashboard session driven over the Streamlit websocket protocol, like a
+    browser tab: every rerun sends the values of the widgets currently on the
+    page (plus at most one clicked button), and is timed from the request to
+    the end of the script run, including the reruns triggered by st.rerun().
+    """
+
+    def __init__(self, url, stats, timeout):
+        self.url = url
+        self.stats = stats
+        self.timeout = timeout
+        self.ws = None
+        self.elements = []
+        self.values = {}
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None)
+        self.elements, self.values = [], {}
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+            self.ws = None
+
+    async def act(self, view, *states, expect=None, errors_ok=False):
+        """
+        Rerun the app with the current widget values updated by `states`, and
+        record the time to render `view`. The render fails on an exception, on
+        an st.error (unless `errors_ok`) and when no `expect` element is on the page.
+        """
+        for state in states:
+            if not state.HasField("trigger_value"):
+                self.values[state.id] = state
+        widgets = list(self.values.values()) + [state for state in states if state.HasField("trigger_value")]
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._rerun(widgets), self.timeout)
+            self._check(expect, errors_ok)
+        except (LoadTestError, asyncio.TimeoutError, websockets.ConnectionClosed) as e:
+            self.stats.error(view)
+            raise LoadTestError(f"{view}: {e!r}") from e
+        self.stats.add(view, time.perf_counter() - start)
+
+    async def _rerun(self, widgets):
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.widget_states.widgets.extend(widgets)
+        await self.ws.send(message.SerializeToString())
+
+        elements = []
+        while True:
+            response = ForwardMsg()
+            response.ParseFromString(await self.ws.recv())
+            kind = response.WhichOneof("type")
+            if kind == "delta" and response.delta.WhichOneof("type") == "new_element":
+                element = response.delta.new_element
+                elements.append((element.WhichOneof("type"), getattr(element, element.WhichOneof("type"))))
+            elif kind == "script_finished":
+                if response.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    elements = []
+                    continue
+                break
+
+        self.elements = elements
+        # The frontend only sends back the widgets still on the page
+        ids = {getattr(element, "id", None) for _, element in elements}
+        self.values = {id_: state for id_, state in self.values.items() if id_ in ids}
+        errors = [element.message for kind, element in elements if kind == "exception"]
+        if errors:
+            raise LoadTestError(errors[0])
+
+    def _check(self, expect, errors_ok):
+        errors = [element.body for element in self.find("alert") if element.format == Alert.ERROR]
+        if errors and not errors_ok:
+            raise LoadTestError(f"error shown: {errors[0]}")
+        if expect is not None and not self.find(expect):
+            raise LoadTestError(f"no {expect} rendered")
+
+    def find(self, kind, label=None):
+        return [element for k, element in self.elements if k == kind and (label is None or element.label == label)]
+
+    def click(self, label):
+        buttons = self.find("button", label)
+        if not buttons:
+            raise LoadTestError(f"no {label!r} button")
+        return WidgetState(id=buttons[0].id, trigger_value=True)
+
+    def type_text(self, label, text):
+        inputs = self.find("text_input", label)
+        if not inputs:
+            raise LoadTestError(f"no {label!r} text input")
+        return WidgetState(id=inputs[0].id, string_value=text)
+
+    def select_rows(self, table, rows):
+        return WidgetState(id=self.find("dataframe")[table].id, string_value=json.dumps({"selection": {"rows": rows, "columns": []}}))
+
+    def table(self, n):
+        """
+        The n-th dataframe of the page as a pyarrow Table.
+        """
+        dataframes = self.find("dataframe")
+        if len(dataframes) <= n:
+            raise LoadTestError(f"no dataframe {n}")
+        proto = dataframes[n]
+        data = proto.arrow_data.data or proto.lazy_data.initial_chunk.data
+        return pa.ipc.open_stream(pa.py_buffer(data)).read_all()
+
+
+############
+### User journeys
+############
+
+async def back_to_main(session):
+    if session.find("button", BACK_LABEL):
+        await session.act("back", session.click(BACK_LABEL))
+    if not session.find("dataframe"):
+        # No back button that works on this page: the user reloads the tab
+        await session.close()
+        await session.connect()
+        await session.act("open", expect="dataframe")
+
+
+async def view_player(session, rng):
+    players = session.table(0)
+    await session.act("select_player", session.select_rows(0, [rng.randrange(players.num_rows)]))
+    await session.act("player", session.click("View Player Details"), expect="plotly_chart")
+    await back_to_main(session)
+
+
+async def view_competition(session, rng):
+    competitions = session.table(1)
+    await session.act("select_competition", session.select_rows(1, [rng.randrange(competitions.num_rows)]))
+    await session.act("competition", session.click("View Competition Details"), expect="plotly_chart")
+    await back_to_main(session)
+
+
+async def compare_players(session, rng):
+    players = session.table(0)
+    rows = rng.sample(range(players.num_rows), rng.randint(2, 4))
+    await session.act("select_players", session.select_rows(0, rows))
+    await session.act("compare", session.click(f"Compare {len(rows)} players"), expect="plotly_chart")
+    await back_to_main(session)
+
+
+async def load_more(session, rng):
+    more = [button.label for button in session.find("button") if button.label.startswith("Load ")]
+    if more:
+        await session.act("load_more", session.click(more[0]))
+
+
+def search_query(session, rng):
+    """
+    What people type: a name prefix, a name with a typo, a lower-case WCA ID or
+    the start of a competition name, taken from the leaderboards on the page.
+    """
+    players, competitions = session.table(0), session.table(1)
+    name = rng.choice(players.column("Name").to_pylist())
+    kind = rng.choice(["prefix", "typo", "id", "competition"])
+    if kind == "prefix":
+        return name[:rng.randint(3, len(name))]
+    if kind == "typo" and len(name) > 3:
+        i = rng.randrange(len(name) - 1)
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    if kind == "id":
+        return rng.choice(players.column("WCA ID").to_pylist()).lower()
+    return rng.choice(competitions.column("Name").to_pylist())[:rng.randint(4, 12)]
+
+
+async def search(session, rng):
+    # A query matching nothing shows "No match found.", as it should
+    await session.act("search", session.type_text(SEARCH_LABEL, search_query(session, rng)), errors_ok=True)
+    suggestions = [button.label for button in session.find("button") if button.label.endswith(SUGGESTION_SUFFIXES)]
+    if suggestions:
+        await session.act("search_result", session.click(rng.choice(suggestions)), expect="plotly_chart")
+        await back_to_main(session)
+
+
+JOURNEYS = [view_player, view_competition, compare_players, load_more, search]
+
+
+async def user(n, args, url, stats):
+    """
+    One simulated user: `iterations` visits, each opening a new session and
+    going through every journey in a random order with think times in between.
+    """
+    rng = random.Random(args.seed * 100003 + n)
+    await asyncio.sleep(rng.uniform(0, args.ramp_up))
+    for _ in range(args.iterations):
+        session = Session(url, stats, args.timeout)
+        try:
+            await session.connect()
+            await session.act("open", expect="dataframe")
+            for journey in rng.sample(JOURNEYS, len(JOURNEYS)):
+                await asyncio.sleep(rng.expovariate(1 / args.think) if args.think else 0)
+                await journey(session, rng)
+        except (LoadTestError, OSError) as e:
+            stats.failed_visits += 1
+            if args.verbose:
+                print(f"user {n}: {e}")
+        finally:
+            await session.close()
+
+
+############
+### Report
+############
+
+class Stats:
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.failed_visits = 0
+
+    def add(self, view, seconds):
+        self.durations[view].append(seconds)
+
+    def error(self, view):
+        self.errors[view] += 1
+
+    def summary(self):
+        summary = {}
+        for view in sorted(set(self.durations) | set(self.errors)):
+            ms = np.array(self.durations[view]) * 1000
+            summary[view] = {"count": len(ms), "errors": self.errors[view]}
+            if len(ms):
+                summary[view].update({
+                    "p50_ms": float(np.percentile(ms, 50)),
+                    "p95_ms": float(np.percentile(ms, 95)),
+                    "p99_ms": float(np.percentile(ms, 99)),
+                    "max_ms": float(ms.max()),
+                })
+        return summary
+
+
+def summary_table(summary):
+    header = f"{'view':<20}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    lines = [header, "-" * len(header)]
+    for view, entry in summary.items():
+        cells = "".join(f"{entry[key]:>10.0f}" if key in entry else f"{'':>10}" for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms"))
+        lines.append(f"{view:<20}{entry['count']:>8}{entry['errors']:>8}{cells}")
+    return "\n".join(lines)
+
+
+def comparison_table(summary, baseline):
+    """
+    Ratio current / baseline of each percentile per view (below 1 is faster).
+    """
+    header = f"{'view':<20}{'p50':>10}{'p95':>10}{'p99':>10}"
+    lines = [header, "-" * len(header)]
+    for view, entry in summary.items():
+        before = baseline.get(view, {})
+        cells = ""
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            cells += f"{entry[key] / before[key]:>9.2f}x" if entry.get(key) and before.get(key) else f"{'':>10}"
+        lines.append(f"{view:<20}{cells}")
+    return "\n".join(lines)
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+async def run_users(args, url):
+    stats = Stats()
+    start = time.perf_counter()
+    await asyncio.gather(*[user(n, args, url, stats) for n in range(args.sessions)])
+    return stats, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent dashboard users and report render latency per view")
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent users")
+    parser.add_argument("--iterations", type=int, default=3, help="visits per user")
+    parser.add_argument("--think", type=float, default=1.0, help="mean seconds between two actions of a user")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="users start at random within this many seconds")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds before a render counts as an error")
+    parser.add_argument("--url", help="websocket of an already running dashboard (ws://host:port/_stcore/stream)")
+    parser.add_argument("--local-db", help="run the dashboard on this SQLite export instead of the stub")
+    add_fixture_args(parser)
+    parser.add_argument("--output-dir", default=os.path.join(SCRIPT_DIR, "results"),
+                        help="where the JSON report and the server logs are written")
+    parser.add_argument("--compare", metavar="REPORT_JSON", help="earlier report to compare against")
+    parser.add_argument("--verbose", action="store_true", help="print every failed visit")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    processes = []
+    try:
+        url = args.url
+        if url is None:
+            url, processes = start_processes(args, args.output_dir)
+        print(f"Running {args.sessions} users x {args.iterations} visits against {url}...")
+        stats, elapsed = asyncio.run(run_users(args, url))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    summary = stats.summary()
+    report = {
+        "commit": git_commit(),
+        "written_at": datetime.now().isoformat(timespec="seconds"),
+        "args": vars(args),
+        "elapsed_s": elapsed,
+        "failed_visits": stats.failed_visits,
+        "views": summary,
+    }
+    path = os.path.join(args.output_dir, f"loadtest-{report['commit']}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{sum(entry['count'] for entry in summary.values()):,} renders in {elapsed:.1f}s, "
+          f"{stats.failed_visits} failed visits")
+    print(summary_table(summary))
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nLatency vs {baseline['commit']}")
+        print(comparison_table(summary, baseline["views"]))
+    print(f"\nReport written to {path}")
+
+
+if __name__ == "__main__":
+    main()
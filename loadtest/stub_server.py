@@ -0,0 +1,345 @@
+import argparse
+import operator
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+
+
+COUNTRIES = ['US', 'CN', 'IN', 'BR', 'FR', 'DE', 'GB', 'PL', 'AU', 'CA', 'ES', 'IT', 'JP', 'KR', 'PH', 'RU', 'MX', 'PE', 'CO', 'NA']
+FIRST_NAMES = ['Max', 'Feliks', 'Yiheng', 'Tymon', 'Ruihang', 'Sebastian', 'Léo', 'Zoé', 'Luis', 'Yusheng',
+               'Patrick', 'Anna', 'Mats', 'Lucas', 'Kai', 'Sofía', 'Björn', 'Ana', 'Jakub', 'Chloé']
+LAST_NAMES = ['Park', 'Zemdegs', 'Wang', 'Kolasiński', 'Xu', 'Weyer', 'Borromeo', 'Müller', 'Valk', 'Du',
+              'Ponce', 'Etter', 'García', 'Nowak', 'Dubois', 'Søndergaard', 'Kim', 'Silva', 'Rossi', 'Ito']
+CITIES = ['Paris', 'Melbourne', 'Beijing', 'Warsaw', 'São Paulo', 'Seattle', 'Tokyo', 'Madrid', 'Windhoek', 'Lima']
+
+METRIC_RANKS = ['rank90best', 'rank90avg', 'rank365best', 'rank365avg']
+METRIC_TIMES = ['best_365', 'average_365', 'best_90', 'average_90']
+
+
+############
+### Fixture data
+############
+
+def build_tables(n_players=10000, n_competitions=1500, mean_weeks=80, seed=0):
+    """
+    Deterministic fixture data with the columns of the Supabase tables and
+    views read by the dashboard (see sql/schema.sql), dates as 'YYYY-MM-DD'.
+    The rankings are all for the 3x3 event.
+    Returns:
+    - dict table name -> DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    last_week = pd.Timestamp('2025-06-30')
+
+    ids = [f'{2005 + i % 20}{FIRST_NAMES[i % 20][:2].upper()}{LAST_NAMES[i // 20 % 20][:2].upper()}{i // 400:02d}'
+           for i in range(n_players)]
+    persons = pd.DataFrame({
+        'id': ids,
+        'name': [f'{FIRST_NAMES[i % 20]} {LAST_NAMES[i // 20 % 20]} {i // 400 or ""}'.strip() for i in range(n_players)],
+        'country': rng.choice(COUNTRIES, n_players),
+    })
+
+    # Weekly history per player, of random length, ending at the last week for most of them
+    weeks = rng.geometric(1 / mean_weeks, n_players).clip(2, 15 * 52)
+    ends = np.where(rng.random(n_players) < 0.7, 0, rng.integers(1, 200, n_players))
+    person_idx = np.repeat(np.arange(n_players), weeks)
+    step = np.arange(len(person_idx)) - np.repeat(np.cumsum(weeks) - weeks, weeks)
+    weeks_before_last = np.repeat(ends + weeks - 1, weeks) - step
+    level = np.exp(rng.normal(np.log(20), 0.4, n_players))[person_idx] * (1 + 0.2 * np.exp(-step / 50))
+    metrics = pd.DataFrame({
+        'date': (last_week - pd.to_timedelta(weeks_before_last * 7, unit='D')).strftime('%Y-%m-%d'),
+        'personId': persons['id'].to_numpy()[person_idx],
+    })
+    for column in METRIC_RANKS:
+        metrics[column] = (level * 40 * rng.lognormal(0, 0.05, len(metrics))).round()
+    for column in METRIC_TIMES:
+        metrics[column] = (level * 100 * rng.lognormal(0, 0.03, len(metrics))).round()
+    metrics['country'] = persons['country'].to_numpy()[person_idx]
+    for column in METRIC_RANKS:
+        metrics[f'{column}_national'] = (metrics[column] / 20).round() + 1
+    # Averages need several results in the window
+    metrics.loc[rng.random(len(metrics)) < 0.1, ['rank90avg', 'average_90', 'rank90avg_national']] = np.nan
+
+    latest = metrics.groupby('personId', sort=False).tail(1).drop(columns=['date', 'country'])
+    latest = persons.merge(latest, left_on='id', right_on='personId').drop(columns='personId')
+
+    series = rng.integers(0, max(1, n_competitions // 4), n_competitions)
+    dates = pd.Timestamp('2011-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 5300, n_competitions)), unit='D')
+    comp_id = np.char.add(np.array(CITIES)[series % len(CITIES)], np.char.add('Open', series.astype(str)))
+    competitions = pd.DataFrame({
+        'id': np.char.add(comp_id, dates.year.astype(str).to_numpy()),
+        'comp_id': comp_id,
+        'name': [f'{CITIES[s % len(CITIES)]} Open {s} {d.year}' for s, d in zip(series, dates)],
+        'city': np.array(CITIES)[series % len(CITIES)],
+        'country': rng.choice(COUNTRIES, n_competitions),
+        'date_from': dates.strftime('%Y-%m-%d'),
+    }).drop_duplicates('id')
+    ranking = pd.DataFrame({
+        'competition_id': competitions['id'],
+        'comp_id': competitions['comp_id'],
+        'rank90avg_avg': rng.lognormal(7, 1, len(competitions)).round(1),
+        'rank365avg_avg': rng.lognormal(7, 1, len(competitions)).round(1),
+        'perf90avg': rng.normal(1500, 300, len(competitions)).round(),
+        'perf365avg': rng.normal(1500, 300, len(competitions)).round(),
+    })
+    latest_ranking = ranking.merge(
+        competitions[['id', 'name', 'city', 'country', 'date_from']], left_on='competition_id', right_on='id'
+    ).drop(columns='id')
+
+    for df in (metrics, latest, ranking, latest_ranking):
+        df.insert(0, 'event', '333')
+
+    return {
+        'persons': persons,
+        'player_metrics': metrics,
+        'latest_player_metrics': latest,
+        'competitions': competitions,
+        'competition_ranking': ranking,
+        'latest_competition_ranking': latest_ranking,
+        'dataset_versions': pd.DataFrame({'event': ['333'], 'version': [f'fixture{seed}']}),
+    }
+
+
+############
+### PostgREST subset
+############
+
+# Indexed columns of sql/schema.sql that api.py filters on
+INDEXES = {
+    'player_metrics': ['event', 'personId'],
+    'competitions': ['comp_id'],
+    'competition_ranking': ['event', 'comp_id'],
+    'latest_player_metrics': ['event', 'id'],
+    'latest_competition_ranking': ['event', 'competition_id'],
+}
+# Filtered orderings matching at least this many rows are kept (the per-event leaderboards)
+CACHED_ORDER_ROWS = 1000
+# Operators of the and / or logic trees (the keyset pages of data_source.player_metrics_chunks)
+LOGIC_OPERATORS = {'eq': operator.eq, 'gt': operator.gt}
+
+
+def _sort(df, order):
+    """
+    Row labels of `df` in a PostgREST `order` (e.g. "rank365avg.asc,id.asc").
+    """
+    columns, ascending = [], []
+    for term in order.split(','):
+        column, direction = (term.split('.') + ['asc'])[:2]
+        columns.append(column)
+        ascending.append(direction == 'asc')
+    # Postgres puts nulls last in ascending order, first in descending order
+    na_position = 'last' if ascending[0] else 'first'
+    return df.sort_values(columns, ascending=ascending, na_position=na_position, kind='stable').index.to_numpy()
+
+
+def _split_terms(text):
+    """
+    Top-level terms of a PostgREST logic tree body, e.g. 'a.gt.1,and(a.eq.1,b.gt."x,y")'.
+    """
+    terms, depth, quoted, start = [], 0, False, 0
+    for i, char in enumerate(text):
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and char == ',' and depth == 0:
+            terms.append(text[start:i])
+            start = i + 1
+    terms.append(text[start:])
+    return terms
+
+
+def _logic_mask(df, logic, tree):
+    """
+    Rows of `df` matching an `and=(...)` / `or=(...)` tree of column.eq / column.gt conditions.
+    """
+    masks = []
+    for term in _split_terms(tree[1:-1]):
+        nested = term.split('(', 1)[0]
+        if nested in ('and', 'or'):
+            masks.append(_logic_mask(df, nested, term[len(nested):]))
+            continue
+        column, op, value = term.split('.', 2)
+        masks.append(LOGIC_OPERATORS[op](df[column], value.strip('"')).to_numpy())
+    return (np.logical_and if logic == 'and' else np.logical_or).reduce(masks)
+
+
+class Table:
+    """
+    A fixture table with the lookups PostgREST gets from its indexes: row
+    positions per value of the indexed columns, and the orderings of the whole
+    table or of large filtered parts of it (built on first use, the leaderboards
+    ask for the same ones every time).
+    """
+
+    def __init__(self, df, indexes=()):
+        self.df = df.reset_index(drop=True)
+        self._positions = {column: self.df.groupby(column, sort=False).indices for column in indexes}
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def positions(self, column, values):
+        with self._lock:
+            if column not in self._positions:
+                self._positions[column] = self.df.groupby(column, sort=False).indices
+            index = self._positions[column]
+        found = [index[value] for value in values if value in index]
+        return np.sort(np.concatenate(found)) if found else np.array([], dtype=np.int64)
+
+    def order(self, order, filters=(), rows=None):
+        key = (tuple(filters), order)
+        with self._lock:
+            if key not in self._orders:
+                self._orders[key] = _sort(self.df if rows is None else self.df.iloc[rows], order)
+            return self._orders[key]
+
+    def query(self, filters, order=None):
+        """
+        Row positions matching every `column=eq.value` / `column=in.(a,b)` filter
+        and `and` / `or` logic tree, in `order`.
+        """
+        trees = [(logic, tree) for logic, tree in filters if logic in ('and', 'or')]
+        rows = self._select([f for f in filters if f[0] not in ('and', 'or')], order)
+        # Trees are applied to the selected rows: keyset pages don't each get a cached ordering
+        for logic, tree in trees:
+            rows = rows[_logic_mask(self.df.iloc[rows], logic, tree)]
+        return rows
+
+    def _select(self, filters, order):
+        rows = None
+        for column, value in filters:
+            operator, operand = value.split('.', 1)
+            values = operand.strip('()').split(',') if operator == 'in' else [operand]
+            matches = self.positions(column, values)
+            rows = matches if rows is None else np.intersect1d(rows, matches)
+        if rows is None:
+            return self.order(order) if order else np.arange(len(self.df))
+        if order and len(rows) >= CACHED_ORDER_ROWS:
+            return self.order(order, filters, rows)
+        return _sort(self.df.iloc[rows], order) if order else rows
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    GET /rest/v1/<table> with the parts of the PostgREST API used by api.py:
+    select, order, limit/offset, eq / in filters, and / or trees, Range and Prefer: count=exact
+    headers, and JSON or CSV (Accept: text/csv) bodies.
+    Every response waits `latency` + up to `jitter` seconds first.
+    """
+    tables = {}
+    latency = 0.0
+    jitter = 0.0
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+        url = urlsplit(self.path)
+        table = self.tables.get(url.path.rsplit('/', 1)[-1])
+        if table is None or not url.path.startswith('/rest/v1/'):
+            return self._send(404, b'{"message": "relation does not exist"}', 'application/json')
+
+        select, order, offset, limit, filters = None, None, 0, None, []
+        for key, value in parse_qsl(url.query):
+            if key == 'select':
+                select = None if value == '*' else value.split(',')
+            elif key == 'order':
+                order = value
+            elif key == 'offset':
+                offset = int(value)
+            elif key == 'limit':
+                limit = int(value)
+            else:
+                filters.append((key, value))
+        rows = table.query(filters, order)
+        total = len(rows)
+
+        status, headers = 200, {}
+        if self.headers.get('Range'):
+            start, end = self.headers['Range'].split('-')
+            offset = int(start)
+            limit = int(end) - offset + 1 if end else None
+        if offset and offset >= total:
+            return self._send(416, b'', 'application/json', {'Content-Range': f'*/{total}'})
+        rows = rows[offset:offset + limit if limit is not None else None]
+        counted = 'count=exact' in (self.headers.get('Prefer') or '')
+        content_range = f'{offset}-{offset + len(rows) - 1}' if len(rows) else '*'
+        headers['Content-Range'] = f"{content_range}/{total if counted else '*'}"
+        if counted and len(rows) < total:
+            status = 206
+
+        df = table.df.iloc[rows]
+        if select:
+            df = df[select]
+        if 'text/csv' in (self.headers.get('Accept') or ''):
+            body, content_type = (df.to_csv(index=False) if len(df) else '').encode(), 'text/csv'
+        else:
+            body, content_type = df.to_json(orient='records', force_ascii=False).encode(), 'application/json'
+        self._send(status, body, content_type, headers)
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(tables, host='127.0.0.1', port=8799, latency=0.0, jitter=0.0):
+    """
+    Start the stub in a daemon thread (port 0 picks a free port).
+    Returns:
+    - the server; its URL is f"http://{host}:{server.server_port}"
+    """
+    handler = type('Handler', (StubHandler,), {
+        'tables': {name: Table(df, INDEXES.get(name, ())) for name, df in tables.items()},
+        'latency': latency,
+        'jitter': jitter,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_fixture_args(parser):
+    parser.add_argument('--players', type=int, default=10000, help="players in the fixture leaderboard")
+    parser.add_argument('--competitions', type=int, default=1500)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=50, help="milliseconds added to every response")
+    parser.add_argument('--jitter', type=float, default=30, help="up to this many random milliseconds on top")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Supabase endpoints of the dashboard")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8799)
+    add_fixture_args(parser)
+    args = parser.parse_args()
+
+    tables = build_tables(args.players, args.competitions, seed=args.seed)
+    server = serve(tables, args.host, args.port, args.latency / 1000, args.jitter / 1000)
+    print(f"Serving {', '.join(f'{name} ({len(df):,})' for name, df in tables.items())}")
+    print(f"Run the dashboard with SUPABASE_URL=http://{args.host}:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
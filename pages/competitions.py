@@ -1,24 +1,20 @@
 import streamlit as st
 import pandas as pd
-import requests
 import plotly.graph_objects as go
-from api import SUPABASE_URL, HEADERS
+from api import EVENTS, event_name, fetch_concurrently
+from cache import cache, get_cached_competition_history, get_cached_competition_metadata
+from exports import download_buttons
 import uuid
 
 #test
-@st.cache_data(ttl=3600)
-def fetch_competition_history(comp_id):
-    url = f"{SUPABASE_URL}/rest/v1/competition_ranking?comp_id=eq.{comp_id}&select=*"
-    return requests.get(url, headers=HEADERS).json()
 
-@st.cache_data(ttl=3600)
-def fetch_competition_metadata(comp_id):
-    url = f"{SUPABASE_URL}/rest/v1/competitions?comp_id=eq.{comp_id}&select=id, name,city,country,date_from"
-    return requests.get(url, headers=HEADERS).json()
-
-def show_competition_page(comp_id):
-    st.header(f"Competition Detail: {comp_id}")
-    meta = fetch_competition_metadata(comp_id)
+def show_competition_page(comp_id, event):
+    st.header(f"Competition Detail: {comp_id} · {event_name(event)}")
+    # Metadata and history are independent queries: fetch them in parallel
+    meta, history = fetch_concurrently(
+        lambda: get_cached_competition_metadata(comp_id),
+        lambda: get_cached_competition_history(comp_id, event),
+    )
     meta_df = pd.DataFrame(meta)  
     if not meta:
         st.error("Not found.")
@@ -29,17 +25,18 @@ def show_competition_page(comp_id):
     st.subheader(f"{m['name']} ({m['city']}, {m['country']})")
     st.caption(f"Date: {m['date_from']}")
 
-    df = pd.DataFrame(fetch_competition_history(comp_id))
+    df = pd.DataFrame(history)
     if df.empty:
         st.error("No data.")
         return
     df = df.merge(meta_df[["id", "date_from"]], how="left", left_on="competition_id", right_on="id")
 
-    # Convert performance data from centiseconds to seconds
+    # Convert performance data to the event's unit (seconds, moves or multi-blind points)
+    spec = EVENTS[event]
     perf_columns = [col for col in df.columns if 'perf' in col and col != 'date_from']
     for col in perf_columns:
         if col in df.columns:
-            df[col] = df[col] / 100
+            df[col] = spec["mean"](df[col])
 
     col1, col2 = st.columns(2)
     metric = col1.selectbox("Metric", ["perf", "rank"])
@@ -71,14 +68,14 @@ def show_competition_page(comp_id):
         fig.update_layout(
             title=f"Performance - {window}d Top 10 Avg",
             xaxis_title="Competition Date",
-            yaxis_title="Performance (seconds)",
+            yaxis_title=f"Performance ({spec['unit']})",
             yaxis=dict(autorange=True)  # Reset autorange for performance
         )
 
     st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": True})
 
-    csv = df.to_csv(index=False).encode("utf-8")
-    st.download_button("📄 Download Data as CSV", csv, "competition_data.csv", "text/csv")
+    versions = (cache.version(("competition_metadata", comp_id)), cache.version(("competition_history", comp_id, event)))
+    download_buttons(df, ("competition", comp_id, event) + versions, f"competition_data_{event}")
 
     # Back button (placed at the end of the function)
 if st.button("← Back to main view"):
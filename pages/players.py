@@ -1,20 +1,17 @@
 # pages/player.py
 import streamlit as st
-import pandas as pd
-import requests
 import plotly.graph_objects as go
-from api import SUPABASE_URL, HEADERS
+from api import EVENTS, event_name
+from cache import cache, get_cached_player_history, get_cached_players_history
+from charts import downsample
+from exports import download_buttons
+from search_index import get_search_index
 
-@st.cache_data(ttl=3600)
-def fetch_player_history(person_id):
-    url = f"{SUPABASE_URL}/rest/v1/player_metrics?personId=eq.{person_id}&select=*&order=date.asc"
-    return requests.get(url, headers=HEADERS).json()
-
-def show_player_page(person_id):
+def show_player_page(person_id, event):
     # Header with back button
     col1, col2 = st.columns([4, 1])
     with col1:
-        st.header(f"Player Detail: {person_id}")
+        st.header(f"Player Detail: {person_id} · {event_name(event)}")
     with col2:
         if st.button("← Back to main view", type="secondary"):
             # Use the navigation function from main app
@@ -22,8 +19,8 @@ def show_player_page(person_id):
             st.session_state.selected_person_id = None
             st.rerun()
     
-    # Fetch and display data
-    df = pd.DataFrame(fetch_player_history(person_id))
+    # Fetch and display data (a typed frame shared through the cache, not modified here)
+    df = get_cached_player_history(person_id, event)
     if df.empty:
         st.error("No data found.")
         return
@@ -37,9 +34,13 @@ def show_player_page(person_id):
     avg = f"rank{window}avg" if metric == "rank_world" else f"rank{window}avg_national"
     best = f"rank{window}best" if metric == "rank_world" else f"rank{window}best_national"
 
+    # Downsampled WebGL traces keep long weekly histories responsive
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=df["date"], y=df[avg], name="Average"))
-    fig.add_trace(go.Scatter(x=df["date"], y=df[best], name="Best"))
+    # Multi-blind has no average
+    traces = [(avg, "Average"), (best, "Best")] if EVENTS[event]["average"] else [(best, "Best")]
+    for column, name in traces:
+        points = downsample(df, "date", column)
+        fig.add_trace(go.Scattergl(x=points["date"], y=points[column], name=name, mode="lines"))
     fig.update_layout(
         title="Ranking Evolution", 
         xaxis_title="Date", 
@@ -49,6 +50,51 @@ def show_player_page(person_id):
 
     st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": True})
 
-    # Download button
-    csv = df.to_csv(index=False).encode("utf-8")
-    st.download_button("📄 Download Data as CSV", csv, "player_data.csv", "text/csv")
\ No newline at end of file
+    # Download buttons, serialized only when clicked
+    version = cache.version(("player_history", person_id, event))
+    download_buttons(df, ("player_history", person_id, event, version), f"player_data_{event}")
+
+def show_comparison_page(person_ids, event):
+    col1, col2 = st.columns([4, 1])
+    with col1:
+        st.header(f"Player Comparison: {len(person_ids)} players · {event_name(event)}")
+    with col2:
+        if st.button("← Back to main view", type="secondary"):
+            st.session_state.current_view = 'main'
+            st.session_state.compare_person_ids = []
+            st.rerun()
+
+    # One query for every selected player, rank columns only
+    df = get_cached_players_history(person_ids, event)
+    if df.empty:
+        st.error("No data found.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    metric = col1.selectbox("Metric", ["rank_world", "rank_country"])
+    window = col2.radio("Window", ["90", "365"], horizontal=True)
+    # Defaults to the result kind the event is ranked by
+    kinds = ["avg", "best"]
+    kind = col3.radio("Solves", kinds, index=kinds.index(EVENTS[event]["ranked_by"]), horizontal=True)
+
+    column = f"rank{window}{kind}" if metric == "rank_world" else f"rank{window}{kind}_national"
+
+    index = get_search_index(event)
+    fig = go.Figure()
+    for person_id, history in df.groupby("personId", sort=False):
+        points = downsample(history, "date", column)
+        entry = index.exact(person_id)
+        name = f"{entry[2]} ({person_id})" if entry else person_id
+        fig.add_trace(go.Scattergl(x=points["date"], y=points[column], name=name, mode="lines"))
+    fig.update_layout(
+        title="Ranking Evolution",
+        xaxis_title="Date",
+        yaxis_title="Rank",
+        yaxis_autorange="reversed"
+    )
+
+    st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": True})
+
+    person_ids = tuple(sorted(person_ids))
+    version = cache.version(("players_history", person_ids, event))
+    download_buttons(df, ("players_history", person_ids, event, version), f"players_comparison_{event}")
@@ -1,69 +1,68 @@
 import streamlit as st
-import pandas as pd
-from api import fetch_latest_players, fetch_latest_competitions
-
-@st.cache_data(ttl=3600)
-def get_cached_players():
-    return fetch_latest_players()
-
-@st.cache_data(ttl=3600)
-def get_cached_competitions():
-    return fetch_latest_competitions()
-
-def show_players_tab():
-    data = get_cached_players()
-    df = pd.DataFrame(data)
-
-    # Convert times from centiseconds to seconds
-    for col in ["best_365", "average_365", "best_90", "average_90"]:
-        df[col] = df[col] / 100
-
-    # Add WCA Link
-    df["WCA Link"] = df["id"].apply(
-        lambda x: f"https://www.worldcubeassociation.org/persons/{x}"
-    )
-
-    # Rename columns
-    df = df.rename(columns={
-        "id": "WCA ID",
-        "name": "Name",
-        "country": "Country",
-        "best_365": "1 Solve - 365d (s)",
-        "average_365": "5 Solves - 365d (s)",
-        "best_90": "1 Solve - 90d (s)",
-        "average_90": "5 Solves - 90d (s)",
-        "rank90best": "World Ranking - 1 Solve (90d)",
-        "rank90avg": "World Ranking - 5 Solves (90d)",
-        "rank365best": "World Ranking - 1 Solve (365d)",
-        "rank365avg": "World Ranking - 5 Solves (365d)",
-        "rank90best_national": "National Ranking - 1 Solve (90d)",
-        "rank90avg_national": "National Ranking - 5 Solves (90d)",
-        "rank365best_national": "National Ranking - 1 Solve (365d)",
-        "rank365avg_national": "National Ranking - 5 Solves (365d)"
-    })
-
-    # Sort
-    df = df.sort_values(by="World Ranking - 5 Solves (365d)", ascending=True)
-
-    # Reorder WCA Link to be the last column
-    cols = [col for col in df.columns if col != "WCA Link"] + ["WCA Link"]
-    df = df[cols]
+from api import LEADERBOARD_PAGE_SIZE, prefetch
+from cache import (
+    cache,
+    get_cached_competitions,
+    get_cached_dataset_version,
+    get_cached_players,
+    get_cached_players_history,
+    prefetch_competition,
+    prefetch_player,
+)
+from exports import bulk_download_buttons
+from view_models import competitions_view, players_view
+
+def show_more_button(get_page, state_key, loaded, total, n_pages, label, event):
+    if total is None or loaded >= total:
+        return
+    st.caption(f"Showing {loaded:,} of {total:,} {label}")
+    # Warm the next page in the background so "Load more" renders from cache
+    prefetch(lambda: get_page(n_pages), (state_key, n_pages, event))
+    if st.button(f"Load {LEADERBOARD_PAGE_SIZE} more", key=f"{state_key}_more"):
+        st.session_state[state_key] = n_pages + 1
+        st.rerun()
+
+def show_players_tab(event):
+    n_pages = st.session_state.get("players_pages", 1)
+    # Prepared once per event and dataset version, and shared by every rerun and session
+    view = players_view(n_pages, event)
 
     # Display DataFrame with selection capability
-    event = st.dataframe(
-        df, 
+    table = st.dataframe(
+        view.frame, 
         use_container_width=True, 
         hide_index=True,
         on_select="rerun",
-        selection_mode="single-row"
+        selection_mode="multi-row"
     )
 
+    show_more_button(lambda page: get_cached_players(page, event), "players_pages", view.loaded, view.total, n_pages, "players",
+                     event)
+    # Built in chunks on the first click for this dataset version, then reused. Databases
+    # without dataset_versions fall back to the leaderboard's version, bumped on every refresh.
+    version = get_cached_dataset_version(event) or f"refresh{cache.version(('players', 0, event))}"
+    bulk_download_buttons(version, event)
+
+    # Several rows: compare them on one chart
+    if len(table.selection.rows) > 1:
+        selected_people = list(view.ids[table.selection.rows])
+        prefetch(lambda: get_cached_players_history(selected_people, event),
+                 ("players_history", tuple(selected_people), event))
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.info(f"Selected: {', '.join(selected_people)}")
+        with col2:
+            if st.button(f"Compare {len(selected_people)} players", type="primary"):
+                st.session_state.current_view = 'compare'
+                st.session_state.compare_person_ids = selected_people
+                st.rerun()
+
     # Handle row selection for navigation
-    if len(event.selection.rows) > 0:
-        selected_idx = event.selection.rows[0]
-        # Get original ID before column rename
-        original_data = pd.DataFrame(get_cached_players())
-        selected_person = original_data.iloc[selected_idx]['id']
+    elif len(table.selection.rows) > 0:
+        selected_idx = table.selection.rows[0]
+        selected_person = view.ids[selected_idx]
+        # Load the detail data while the user decides to click
+        prefetch_player(selected_person, event)
         
         col1, col2 = st.columns([3, 1])
         with col1:
@@ -75,59 +74,27 @@ def show_players_tab():
                 st.session_state.selected_person_id = selected_person
                 st.rerun()
 
-def show_competitions_tab():
-    data = get_cached_competitions()
-    df = pd.DataFrame(data)
-
-    # Remove rows with any missing values
-    df = df.dropna()
-
-    # Add WCA Link column
-    df["WCA Link"] = df["competition_id"].apply(
-        lambda x: f"https://www.worldcubeassociation.org/competitions/{x}"
-    )
-
-    for col in ["perf90avg", "perf365avg"]:
-        df[col] = df[col] / 100
-
-    # Rename columns
-    df = df.rename(columns={
-        "name": "Name",
-        "city": "City",
-        "country": "Country",
-        "date_from": "Competition Date",
-        "rank90avg_avg": "Average Ranking - Top 10 (90d)",
-        "rank365avg_avg": "Average Ranking - Top 10 (365d)",
-        "perf90avg": "Avg Perf - Top 10 (90d)",
-        "perf365avg": "Avg Perf - Top 10 (365d)"
-    })
-
-    # Format date
-    df["Competition Date"] = pd.to_datetime(df["Competition Date"]).dt.date
-
-    # Sort
-    df = df.sort_values(by="Average Ranking - Top 10 (365d)", ascending=True)
-
-    # Reorder WCA Link to the end
-    cols = [col for col in df.columns if col != "WCA Link"] + ["WCA Link"]
-    df = df[cols]
+def show_competitions_tab(event):
+    n_pages = st.session_state.get("competitions_pages", 1)
+    view = competitions_view(n_pages, event)
 
     # Display DataFrame with selection capability
-    event = st.dataframe(
-        df, 
+    table = st.dataframe(
+        view.frame, 
         use_container_width=True, 
         hide_index=True,
         on_select="rerun",
         selection_mode="single-row"
     )
 
+    show_more_button(lambda page: get_cached_competitions(page, event), "competitions_pages",
+                     view.loaded, view.total, n_pages, "competitions", event)
+
     # Handle row selection for navigation
-    if len(event.selection.rows) > 0:
-        selected_idx = event.selection.rows[0]
-        # Get original competition_id before column operations
-        original_data = pd.DataFrame(get_cached_competitions()).dropna()
-        selected_comp = original_data.iloc[selected_idx]['competition_id']
-        comp_name = original_data.iloc[selected_idx]['name']
+    if len(table.selection.rows) > 0:
+        selected_idx = table.selection.rows[0]
+        selected_comp, comp_name = view.selected(selected_idx)
+        prefetch_competition(selected_comp, event)
         
         col1, col2 = st.columns([3, 1])
         with col1:
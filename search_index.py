@@ -0,0 +1,147 @@
+import difflib
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+import numpy as np
+
+from api import DEFAULT_EVENT
+from cache import get_search_entries
+
+PLAYER = "player"
+COMPETITION = "competition"
+
+# Suggestions shown under the search box
+MAX_SUGGESTIONS = 8
+# Fuzzy matches below this difflib ratio are dropped
+FUZZY_CUTOFF = 0.6
+# Entries sharing the most trigrams with the query that are scored with difflib
+FUZZY_CANDIDATES = 100
+
+
+def normalize(text):
+    """
+    Case- and accent-insensitive form used for every key and query.
+    """
+    text = str(text)
+    if text.isascii():
+        return text.casefold().strip()
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).casefold().strip()
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    In-memory index over WCA IDs, player names and competition ids / names.
+
+    - Prefix lookups bisect a sorted key list: every id, every full name and
+      every name word (so "feliks" and "zemdegs" both find "Feliks Zemdegs").
+    - Fuzzy lookups rank the names sharing the most trigrams with the query
+      and keep those whose difflib ratio passes FUZZY_CUTOFF.
+    Entries are (kind, id, name) tuples; competitions are indexed by their full
+    id and opened by `comp_ids[id]` (the id without the year).
+    """
+
+    def __init__(self, players, competitions):
+        self.entries = [(PLAYER, p["id"], p.get("name") or p["id"]) for p in players]
+        self.entries += [(COMPETITION, c["competition_id"], c.get("name") or c["competition_id"]) for c in competitions]
+        self.comp_ids = {c["competition_id"]: c.get("comp_id") or c["competition_id"] for c in competitions}
+        self.by_id = {normalize(entry_id): i for i, (_, entry_id, _) in enumerate(self.entries)}
+        self.labels = [normalize(name) for _, _, name in self.entries]
+
+        keys = [(entry_id, i) for entry_id, i in self.by_id.items()]
+        for i, label in enumerate(self.labels):
+            keys.append((label, i))
+            keys.extend((word, i) for word in label.split()[1:])
+        keys.sort()
+        self.trigrams = self._build_postings()
+        self.keys = [key for key, _ in keys]
+        self.positions = [i for _, i in keys]
+
+    def _build_postings(self):
+        """
+        Trigram -> int32 array of the entries whose name contains it.
+        """
+        postings = defaultdict(list)
+        for i, label in enumerate(self.labels):
+            for gram in _trigrams(label):
+                postings[gram].append(i)
+        return {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def exact(self, query):
+        i = self.by_id.get(normalize(query))
+        return None if i is None else self.entries[i]
+
+    def prefix(self, query, limit=MAX_SUGGESTIONS):
+        query = normalize(query)
+        found = []
+        start = bisect_left(self.keys, query)
+        for key, i in zip(self.keys[start:start + 10 * limit], self.positions[start:start + 10 * limit]):
+            if not key.startswith(query) or len(found) == limit:
+                break
+            if i not in found:
+                found.append(i)
+        return [self.entries[i] for i in found]
+
+    def fuzzy(self, query, limit=MAX_SUGGESTIONS):
+        query = normalize(query)
+        postings = [self.trigrams[gram] for gram in _trigrams(query) if gram in self.trigrams]
+        if not postings:
+            return []
+        counts = np.bincount(np.concatenate(postings), minlength=len(self.entries))
+        candidates = np.argpartition(counts, -FUZZY_CANDIDATES)[-FUZZY_CANDIDATES:] if len(counts) > FUZZY_CANDIDATES else np.arange(len(counts))
+        scored = []
+        for i in candidates[counts[candidates] > 0]:
+            ratio = difflib.SequenceMatcher(None, query, self.labels[i]).ratio()
+            if ratio >= FUZZY_CUTOFF:
+                scored.append((-ratio, int(i)))
+        return [self.entries[i] for _, i in sorted(scored)[:limit]]
+
+    def search(self, query, limit=MAX_SUGGESTIONS):
+        """
+        Exact id first, then prefix matches, then fuzzy matches to fill the list.
+        Returns:
+        - list of (kind, id, name), best first
+        """
+        if not normalize(query):
+            return []
+        results = []
+        exact = self.exact(query)
+        if exact is not None:
+            results.append(exact)
+        for lookup in (self.prefix, self.fuzzy):
+            for entry in lookup(query, limit):
+                if entry not in results:
+                    results.append(entry)
+            if len(results) >= limit:
+                break
+        return results[:limit]
+
+
+# event -> (version, index)
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_search_index(event=DEFAULT_EVENT):
+    """
+    The shared index of `event`, rebuilt only when its cached search entries change version.
+    """
+    (players, competitions), version = get_search_entries(event)
+    with _lock:
+        built = _indexes.get(event)
+        if built is not None and built[0] == version:
+            return built[1]
+    index = SearchIndex(players, competitions)
+    with _lock:
+        _indexes[event] = (version, index)
+    return index
@@ -1,9 +1,15 @@
 import streamlit as st
-from api import fetch_player_by_id, fetch_competition_by_id
+from api import DEFAULT_EVENT, EVENTS, event_name
+from data_source import get_source
 from pages.tabs import show_players_tab, show_competitions_tab
+from cache import warm_up
+from search_index import PLAYER, get_search_index
 
 st.set_page_config(layout="wide")
 
+# Fill the shared cache once per server process, in the background
+warm_up()
+
 # Initialize session state
 if 'current_view' not in st.session_state:
     st.session_state.current_view = 'main'
@@ -11,6 +17,10 @@ if 'selected_person_id' not in st.session_state:
     st.session_state.selected_person_id = None
 if 'selected_comp_id' not in st.session_state:
     st.session_state.selected_comp_id = None
+if 'compare_person_ids' not in st.session_state:
+    st.session_state.compare_person_ids = []
+if 'event' not in st.session_state:
+    st.session_state.event = DEFAULT_EVENT
 
 # Navigation functions
 def go_to_main():
@@ -28,40 +38,71 @@ def go_to_competition(comp_id):
     st.session_state.selected_comp_id = comp_id
     st.session_state.selected_person_id = None
 
+def change_event():
+    # Kept outside the widget key, which Streamlit drops while the detail pages are shown
+    st.session_state.event = st.session_state.event_select
+    st.session_state.players_pages = 1
+    st.session_state.competitions_pages = 1
+
 # Handle different views
 if st.session_state.current_view == 'player':
     from pages.players import show_player_page
-    show_player_page(st.session_state.selected_person_id)
+    show_player_page(st.session_state.selected_person_id, st.session_state.event)
+
+elif st.session_state.current_view == 'compare':
+    from pages.players import show_comparison_page
+    show_comparison_page(st.session_state.compare_person_ids, st.session_state.event)
 
 elif st.session_state.current_view == 'competition':
     from pages.competitions import show_competition_page
-    show_competition_page(st.session_state.selected_comp_id)
+    show_competition_page(st.session_state.selected_comp_id, st.session_state.event)
 
 else:
     # Main view
     st.title("Rubik's Cube Analytics Dashboard")
+    event = st.session_state.event
+    st.selectbox("Event", list(EVENTS), index=list(EVENTS).index(event), format_func=event_name,
+                 key="event_select", on_change=change_event)
     
+    def show_exact_match(search):
+        # Players and competitions outside the leaderboards are still reachable by exact ID
+        player = get_source().player_by_id(search, event)
+        if player:
+            st.success(f"Found player: {search}")
+            if st.button("Go to player page", type="primary"):
+                go_to_player(search)
+                st.rerun()
+            return
+
+        comp = get_source().competition_by_id(search)
+        if comp:
+            st.success(f"Found competition: {comp[0]['name']}")
+            if st.button("Go to competition page", type="primary"):
+                go_to_competition(search)
+                st.rerun()
+            return
+
+        st.error("No match found.")
+
     def handle_global_search():
-        search = st.text_input("Search player or competition ID", placeholder="Enter personId or comp_id...")
-        
+        search = st.text_input("Search player or competition", placeholder="WCA ID, player name, competition name or ID...")
+
         if search:
-            player = fetch_player_by_id(search)
-            if player:
-                st.success(f"Found player: {search}")
-                if st.button("Go to player page", type="primary"):
-                    go_to_player(search)
-                    st.rerun()
+            # Local index over the cached leaderboards: prefix and fuzzy matches, no network call
+            index = get_search_index(event)
+            suggestions = index.search(search)
+            if not suggestions:
+                show_exact_match(search)
                 return
-                
-            comp = fetch_competition_by_id(search)
-            if comp:
-                st.success(f"Found competition: {comp[0]['name']}")
-                if st.button("Go to competition page", type="primary"):
-                    go_to_competition(search)
+
+            for kind, entry_id, name in suggestions:
+                label = f"{name} ({entry_id}) · {'Player' if kind == PLAYER else 'Competition'}"
+                if st.button(label, key=f"search_{kind}_{entry_id}"):
+                    if kind == PLAYER:
+                        go_to_player(entry_id)
+                    else:
+                        go_to_competition(index.comp_ids[entry_id])
                     st.rerun()
-                return
-                
-            st.error("No match found.")
     
     # Render search + tabs
     handle_global_search()
@@ -69,6 +110,6 @@ else:
     # Default Tabs View
     tab1, tab2 = st.tabs(["Players", "Competitions"])
     with tab1: 
-        show_players_tab()
+        show_players_tab(event)
     with tab2: 
-        show_competitions_tab()
\ No newline at end of file
+        show_competitions_tab(event)
\ No newline at end of file
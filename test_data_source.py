@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+import api
+from api import METRIC_COLUMNS, dtypes_for
+from data_source import SupabaseSource
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "loadtest"))
+from stub_server import build_tables, serve  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def stub():
+    tables = build_tables(n_players=300, n_competitions=50)
+    server = serve(tables, port=0)
+    yield tables, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.mark.parametrize("chunk_size", [1000, 2500, 10 ** 6])
+def test_player_metrics_chunks_match_table(stub, monkeypatch, chunk_size):
+    tables, url = stub
+    monkeypatch.setattr(api, "SUPABASE_URL", url)
+
+    chunks = list(SupabaseSource().player_metrics_chunks("333", chunk_size))
+
+    expected = (
+        tables["player_metrics"].sort_values(["personId", "date"], ignore_index=True)[METRIC_COLUMNS]
+        .astype(dtypes_for(METRIC_COLUMNS))
+    )
+    # Several keyset pages per chunk, and a person's weeks spread over page boundaries
+    assert len(expected) > 5 * api.BULK_PAGE_SIZE
+    assert all(len(chunk) >= chunk_size for chunk in chunks[:-1])
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+
+def test_dataset_version(stub, monkeypatch):
+    tables, url = stub
+    monkeypatch.setattr(api, "SUPABASE_URL", url)
+
+    assert SupabaseSource().dataset_version("333") == tables["dataset_versions"]["version"].iloc[0]
+    assert SupabaseSource().dataset_version("222") is None
@@ -0,0 +1,152 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from api import COMPETITION_COLUMNS, DEFAULT_EVENT, EVENTS, PLAYER_COLUMNS, rank_column
+from cache import get_competitions_page, get_players_page
+
+WINDOWS = ["90", "365"]
+
+# Rank column the competitions leaderboard is sorted on: the pipeline averages the ranks of the
+# metric each event is ranked by (pipeline.RANKED_BY_SINGLE) into the *avg_avg columns
+COMPETITION_RANK = "rank365avg_avg"
+
+PERSON_URL = "https://www.worldcubeassociation.org/persons/"
+COMPETITION_URL = "https://www.worldcubeassociation.org/competitions/"
+
+# Prepared views kept across reruns and sessions (one per event, dataset version and page count)
+MAX_VIEWS = 8
+
+
+class LeaderboardView:
+    """
+    Display-ready leaderboard: `frame` is sorted with a positional index, so the
+    row positions reported by st.dataframe selections index `ids` / `names` directly.
+    Treat it as read-only, it is shared by every session.
+    """
+
+    def __init__(self, frame, ids, names, loaded, total):
+        self.frame = frame
+        self.ids = ids
+        self.names = names
+        self.loaded = loaded
+        self.total = total
+
+    def selected(self, position):
+        return self.ids[position], self.names[position]
+
+
+_views = OrderedDict()
+_lock = threading.Lock()
+
+
+def _memoized(key, build):
+    with _lock:
+        view = _views.get(key)
+        if view is not None:
+            _views.move_to_end(key)
+            return view
+    view = build()
+    with _lock:
+        _views[key] = view
+        while len(_views) > MAX_VIEWS:
+            _views.popitem(last=False)
+    return view
+
+
+def _load(get_page, n_pages, event):
+    """
+    Read the first `n_pages` pages of `event` through the shared cache (which also schedules
+    stale pages for refresh) together with the versions that were served.
+    Returns:
+    - (version, frames, total)
+    """
+    version, frames, total = [], [], None
+    for page in range(n_pages):
+        (frame, total), page_version = get_page(page, event)
+        version.append(page_version)
+        frames.append(frame)
+    return tuple(version), frames, total
+
+
+def _with_link(df, id_column, base_url):
+    df["WCA Link"] = base_url + df[id_column].astype(str)
+    return df
+
+
+def player_renames(event):
+    """
+    Display names of the leaderboard columns of `event`, labelled with its unit and kind of average.
+    Returns:
+    - {column: label}, without the average columns for events that have none (multi-blind)
+    """
+    spec = EVENTS[event]
+    # (result column prefix, rank column infix, label)
+    kinds = [("best", "best", "1 Solve")]
+    if spec["average"]:
+        kinds.append(("average", "avg", spec["average"]))
+    renames = {"id": "WCA ID", "name": "Name", "country": "Country"}
+    for result, rank, label in kinds:
+        for window in WINDOWS:
+            renames[f"{result}_{window}"] = f"{label} - {window}d ({spec['unit']})"
+            renames[f"rank{window}{rank}"] = f"World Ranking - {label} ({window}d)"
+            renames[f"rank{window}{rank}_national"] = f"National Ranking - {label} ({window}d)"
+    return renames
+
+
+def competition_renames(event):
+    unit = EVENTS[event]["unit"]
+    renames = {"name": "Name", "city": "City", "country": "Country", "date_from": "Competition Date"}
+    for window in WINDOWS:
+        renames[f"rank{window}avg_avg"] = f"Average Ranking - Top 10 ({window}d)"
+        renames[f"perf{window}avg"] = f"Avg Perf - Top 10 ({window}d, {unit})"
+    return renames
+
+
+def _build_players_view(frames, total, event):
+    # concat copies, the cached pages are never modified
+    df = pd.concat(frames, ignore_index=True)[PLAYER_COLUMNS]
+    loaded = len(df)
+
+    # Convert the stored results (centiseconds, moves, encoded multi-blind) to display units
+    spec = EVENTS[event]
+    for window in WINDOWS:
+        df[f"best_{window}"] = spec["single"](df[f"best_{window}"])
+        df[f"average_{window}"] = spec["mean"](df[f"average_{window}"])
+
+    renames = player_renames(event)
+    df = _with_link(df[[c for c in PLAYER_COLUMNS if c in renames]], "id", PERSON_URL).rename(columns=renames)
+    # The API already orders by this column, a stable sort keeps its tie-break
+    df = df.sort_values(by=renames[rank_column(event)], kind="stable", ignore_index=True)
+
+    return LeaderboardView(df, df["WCA ID"].to_numpy(), df["Name"].to_numpy(), loaded, total)
+
+
+def _build_competitions_view(frames, total, event):
+    df = pd.concat(frames, ignore_index=True)[COMPETITION_COLUMNS]
+    loaded = len(df)
+
+    # Drop competitions without ranked participants; the 90d columns may still be missing
+    df = df.dropna(subset=[COMPETITION_RANK])
+
+    for window in WINDOWS:
+        df[f"perf{window}avg"] = EVENTS[event]["mean"](df[f"perf{window}avg"])
+
+    renames = competition_renames(event)
+    df = _with_link(df, "competition_id", COMPETITION_URL).rename(columns=renames)
+    df["Competition Date"] = pd.to_datetime(df["Competition Date"]).dt.date
+    df = df.sort_values(by=renames[COMPETITION_RANK], kind="stable", ignore_index=True)
+
+    # The detail page shows every edition of a competition: it is opened by comp_id (no year)
+    comp_ids = df.pop("comp_id").to_numpy()
+    return LeaderboardView(df, comp_ids, df["Name"].to_numpy(), loaded, total)
+
+
+def players_view(n_pages=1, event=DEFAULT_EVENT):
+    version, frames, total = _load(get_players_page, n_pages, event)
+    return _memoized(("players", event, version), lambda: _build_players_view(frames, total, event))
+
+def competitions_view(n_pages=1, event=DEFAULT_EVENT):
+    version, frames, total = _load(get_competitions_page, n_pages, event)
+    return _memoized(("competitions", event, version), lambda: _build_competitions_view(frames, total, event))